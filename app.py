@@ -19,14 +19,19 @@ def initialize_agent(
     similarity_top_k=5, 
     system_prompt_override=None
 ):
-    """Initialize the agent and connect to existing Pinecone index."""
+    """
+    Initialize the agent and connect to existing Pinecone index.
+    This agent is shared by all sessions; each session chats through its own spawn_session()
+    copy, so conversations have separate memories but share the index and semantic cache.
+    """
     agent = Agent(
         name="Chartwell Insurance Assistant", 
         use_pinecone=True,
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         similarity_top_k=similarity_top_k,
-        system_prompt_override=system_prompt_override
+        system_prompt_override=system_prompt_override,
+        enable_semantic_cache=True
     )
     
     # Try to connect to existing index first
@@ -82,13 +87,18 @@ Best regards,
 Chartwell Insurance"""
     return email_content
 
+def start_session():
+    """Give this browser session a fresh conversation over the shared agent."""
+    st.session_state.agent = initialize_agent().spawn_session()
+
 def clear_conversation():
     """Clear the conversation history."""
     st.session_state.messages = []
+    start_session()
 
 # Initialize agent
 if 'agent' not in st.session_state:
-    st.session_state.agent = initialize_agent()
+    start_session()
 
 # Sidebar
 st.sidebar.image("https://www.chartwellins.com/img/~www.chartwellins.com/layout-assets/logo.png", use_container_width=True)
@@ -134,7 +144,8 @@ if page == "Document Upload":
                     progress_bar = st.progress(0)
                     
                     try:
-                        st.session_state.agent.ingest_directory(temp_dir)
+                        initialize_agent().ingest_directory(temp_dir)
+                        start_session()
                         progress_bar.progress(100)
                         st.success("✅ Documents successfully indexed!")
                         
@@ -234,6 +245,10 @@ elif page == "Index Status":
         st.write(f"**Storage Type:** {stats.get('storage_type', 'N/A')}")
         st.write(f"**Has Index:** {'✅ Yes' if stats.get('has_index') else '❌ No'}")
         st.write(f"**Agent Ready:** {'✅ Yes' if stats.get('has_agent') else '❌ No'}")
+        chat_stats = stats.get('chat_stats', {})
+        st.write(f"**Document Searches:** {chat_stats.get('tool_calls', 0)} across {chat_stats.get('turns', 0)} turns "
+                 f"({chat_stats.get('direct_replies', 0)} answered directly, "
+                 f"{chat_stats.get('cache_hits', 0)} from cache)")
     
     with col2:
         st.subheader("Configuration")
@@ -247,7 +262,8 @@ elif page == "Index Status":
     with col3:
         if st.button("🔄 Reconnect to Index"):
             try:
-                result = st.session_state.agent.connect_to_existing_index()
+                result = initialize_agent().connect_to_existing_index()
+                start_session()
                 st.success(result)
                 st.rerun()
             except Exception as e:
@@ -255,8 +271,9 @@ elif page == "Index Status":
     
     with col4:
         if st.button("🗑️ Reset Agent"):
-            st.session_state.agent.reset()
+            initialize_agent().reset()
             st.session_state.messages = []
+            start_session()
             st.success("Agent reset successfully!")
             st.rerun()
 
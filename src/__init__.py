@@ -3,6 +3,8 @@
 from .agent import Agent
 from .configuration import Configuration
 from .document_loader import DocumentLoader
+from .embedding_cache import CachedEmbedding
+from .semantic_cache import SemanticCache
 from .vector_store_manager import VectorStoreManager
 
-__all__ = ['Agent', 'Configuration', 'DocumentLoader', 'VectorStoreManager']
+__all__ = ['Agent', 'CachedEmbedding', 'Configuration', 'DocumentLoader', 'SemanticCache', 'VectorStoreManager']
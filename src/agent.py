@@ -1,13 +1,28 @@
+import asyncio
+import copy
+import hashlib
+import re
+from typing import List
+
 # Import a bunch of llama-index stuff
 from llama_index.core import Settings
-from llama_index.core.tools import RetrieverTool
-from llama_index.agent.openai import OpenAIAgent
+from llama_index.core.llms import ChatMessage
+from llama_index.core.tools import FunctionTool, RetrieverTool
+from llama_index.core.vector_stores import MetadataFilter, MetadataFilters
 
 # Import our clean components
 from .configuration import Configuration
-from .document_loader import DocumentLoader
+from .document_loader import KNOWN_CARRIERS, DocumentLoader
+from .semantic_cache import SemanticCache
 from .vector_store_manager import VectorStoreManager
 
+# Greetings, thanks and other small talk that never needs document retrieval
+_SMALL_TALK_RE = re.compile(
+    r"^\s*(hi|hello|hey|good (morning|afternoon|evening)|thanks|thank you|thx|"
+    r"bye|goodbye|who are you|what can you do)\b[\s!.?,]*(there|again|so much|a lot)?[\s!.?]*$",
+    re.IGNORECASE
+)
+
 
 class Agent:
     def __init__(
@@ -18,7 +33,15 @@ class Agent:
         chunk_size: int = 512,
         chunk_overlap: int = 50,
         similarity_top_k: int = 5,
-        system_prompt_override: str = None
+        system_prompt_override: str = None,
+        chunker: str = "simple",
+        # Two-stage retrieval: fetch rerank_candidates chunks, keep the best rerank_top_n
+        rerank_top_n: int = None,
+        rerank_candidates: int = 40,
+        reranker_model: str = "BAAI/bge-reranker-base",
+        # Response caching
+        enable_semantic_cache: bool = False,
+        semantic_cache_threshold: float = 0.98
     ):
         self.name = name
         
@@ -27,12 +50,17 @@ class Agent:
         self.chunk_overlap = chunk_overlap
         self.similarity_top_k = similarity_top_k
         self.system_prompt_override = system_prompt_override
+        self.rerank_top_n = rerank_top_n
+        self.rerank_candidates = rerank_candidates
+        self.reranker_model = reranker_model
+        self._reranker = None
         
         # Initialize components with parameters
         self.config = Configuration()
         self.document_loader = DocumentLoader(
             chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
+            chunk_overlap=chunk_overlap,
+            chunker=chunker
         )
         self.vector_store_manager = VectorStoreManager(
             use_pinecone=use_pinecone,
@@ -41,9 +69,15 @@ class Agent:
             chunk_overlap=chunk_overlap
         )
         self.agent = None
+        self._tools = []
+        self._ingested_hashes = {}
+        self.chat_stats = {'turns': 0, 'direct_replies': 0, 'tool_calls': 0, 'cache_hits': 0}
+        self.semantic_cache = SemanticCache(threshold=semantic_cache_threshold) if enable_semantic_cache else None
         
         print(f"Initialized {self.name} with {self.config}")
         print(f"Tuning parameters: chunk_size={chunk_size}, chunk_overlap={chunk_overlap}, top_k={similarity_top_k}")
+        if rerank_top_n:
+            print(f"Reranking top {rerank_candidates} chunks to {rerank_top_n} with {reranker_model}")
         if use_pinecone and not self.config.has_pinecone_config():
             print("Warning: Pinecone mode requested but no Pinecone configuration found in .env")
 
@@ -51,23 +85,65 @@ class Agent:
         """
         Ingest all files in a directory and create a vector store index.
         Uses the DocumentLoader to load documents and VectorStoreManager to create index.
+        Files whose contents were already ingested by this agent are skipped, and new
+        files are added to the existing index instead of rebuilding it.
         """
+        # Only load files whose contents have not been ingested yet
+        file_paths = self.document_loader.list_supported_files(directory_path)
+        new_files = {}
+        for file_path in file_paths:
+            content_hash = self._hash_file(file_path)
+            if content_hash not in self._ingested_hashes:
+                new_files[content_hash] = file_path
+        
+        skipped = len(file_paths) - len(new_files)
+        if skipped:
+            print(f"Skipping {skipped} already ingested files")
+        
         # Load documents using DocumentLoader
-        documents = self.document_loader.load_from_directory(directory_path)
+        loaded_files = self.document_loader.load_files_by_path(list(new_files.values()))
+        documents = [doc for file_docs in loaded_files.values() for doc in file_docs]
         
         if documents:
-            # Create index using VectorStoreManager
-            index = self.vector_store_manager.create_index(documents)
+            # Add to the index using VectorStoreManager (creates it on first ingest)
+            index = self.vector_store_manager.add_documents(documents)
+            # Only files that produced documents count as ingested; failed files are retried next time
+            self._ingested_hashes.update(
+                (content_hash, file_path) for content_hash, file_path in new_files.items()
+                if loaded_files.get(file_path)
+            )
             
-            # Create query tool
-            query_tool = self._create_query_tool(index)
+            # Create query tools
+            query_tools = [self._create_query_tool(index), self._create_filtered_query_tool(index)]
             
             # Create agent
-            self._create_agent([query_tool])
+            self._create_agent(query_tools)
             
-            print(f"Successfully created agent with {len(documents)} documents")
+            print(f"Successfully created agent with {len(documents)} new documents")
         else:
-            print("No documents found to index")
+            print("No new documents found to index")
+
+    def update_query_settings(self, similarity_top_k: int, system_prompt_override: str = None):
+        """
+        Change the retrieval depth and system prompt without re-ingesting documents.
+        The query tools and agent are rebuilt over the existing index.
+        """
+        self.similarity_top_k = similarity_top_k
+        self.system_prompt_override = system_prompt_override
+        
+        index = self.vector_store_manager.index
+        if index is not None:
+            query_tools = [self._create_query_tool(index), self._create_filtered_query_tool(index)]
+            self._create_agent(query_tools)
+
+    @staticmethod
+    def _hash_file(file_path) -> str:
+        """Hash a file's contents to recognize files that were already ingested."""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
 
     def connect_to_existing_index(self):
         """
@@ -82,11 +158,11 @@ class Agent:
             # Connect to existing index using VectorStoreManager
             index = self.vector_store_manager.connect_to_existing_index()
             
-            # Create query tool
-            query_tool = self._create_query_tool(index)
+            # Create query tools
+            query_tools = [self._create_query_tool(index), self._create_filtered_query_tool(index)]
             
             # Create agent
-            self._create_agent([query_tool])
+            self._create_agent(query_tools)
             
             print("Successfully connected to existing Pinecone index")
             return "Agent connected to existing index and ready to chat!"
@@ -103,15 +179,102 @@ class Agent:
         
         if get_response:
             response = self.agent.chat(message)
+            self._record_turn(response)
             return response
-        else:
-            response = self.agent.chat(message)
-            return str(response)
+        
+        # Small talk is answered directly without invoking the retrieval agent
+        if _SMALL_TALK_RE.match(message):
+            self.chat_stats['turns'] += 1
+            self.chat_stats['direct_replies'] += 1
+            reply = Settings.llm.chat([
+                ChatMessage(role="system", content=self._get_system_prompt()),
+                *self.agent.memory.get(),
+                ChatMessage(role="user", content=message)
+            ])
+            response = str(reply.message.content)
+            self._remember_exchange(message, response)
+            return response
+        
+        # Return a cached answer for near-identical earlier questions. Only the first turn of a
+        # conversation is cached, since later answers depend on the chat history
+        query_embedding = None
+        if self.semantic_cache is not None and not self.agent.memory.get():
+            query_embedding = Settings.embed_model.get_query_embedding(message)
+            cached_response = self.semantic_cache.lookup(query_embedding)
+            if cached_response is not None:
+                self.chat_stats['turns'] += 1
+                self.chat_stats['cache_hits'] += 1
+                self._remember_exchange(message, cached_response)
+                return cached_response
+        
+        agent_response = self.agent.chat(message)
+        self._record_turn(agent_response)
+        response = str(agent_response)
+        if query_embedding is not None:
+            self.semantic_cache.add(query_embedding, response)
+        return response
+
+    async def achat(self, message: str, get_response = False) -> str:
+        """Asynchronously chat with the agent."""
+        if self.agent is None:
+            return "Please ingest documents first using ingest_directory()"
+        
+        response = await self.agent.achat(message)
+        self._record_turn(response)
+        return response if get_response else str(response)
+
+    async def achat_batch(self, messages: List[str], max_concurrency: int = 8, get_response = False) -> list:
+        """
+        Answer independent messages concurrently.
+        
+        Each message gets its own agent over the same tools so conversations do not
+        share chat memory. Results are returned in input order.
+        """
+        if self.agent is None:
+            return ["Please ingest documents first using ingest_directory()" for _ in messages]
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _answer(message: str):
+            async with semaphore:
+                response = await self._build_agent(self._tools).achat(message)
+                self._record_turn(response)
+                return response if get_response else str(response)
+        
+        return await asyncio.gather(*(_answer(message) for message in messages))
+
+    def chat_batch(self, messages: List[str], max_concurrency: int = 8, get_response = False) -> list:
+        """Synchronous wrapper around achat_batch."""
+        return asyncio.run(self.achat_batch(messages, max_concurrency=max_concurrency, get_response=get_response))
+
+    def spawn_session(self) -> "Agent":
+        """
+        Return a copy of this agent that shares its index, tools, configuration and
+        semantic cache but has its own chat memory, so it can be used from another thread.
+        """
+        session = copy.copy(self)
+        session.agent = self._build_agent(self._tools) if self.agent is not None else None
+        session.chat_stats = {'turns': 0, 'direct_replies': 0, 'tool_calls': 0, 'cache_hits': 0}
+        return session
+
+    def _remember_exchange(self, message: str, response: str):
+        """Add a turn answered outside the agent to its chat memory so follow-ups see it."""
+        self.agent.memory.put(ChatMessage(role="user", content=message))
+        self.agent.memory.put(ChatMessage(role="assistant", content=response))
+
+    def _record_turn(self, response):
+        """Track how often the agent chose to call the document search tool."""
+        self.chat_stats['turns'] += 1
+        self.chat_stats['tool_calls'] += len(getattr(response, 'sources', None) or [])
 
     def reset(self):
         """Reset the agent and clear all indexed documents."""
         self.vector_store_manager.reset()
         self.agent = None
+        self._tools = []
+        self._ingested_hashes = {}
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
         print("Agent reset. Call ingest_directory() to load new documents.")
 
     def get_index_stats(self) -> dict:
@@ -120,15 +283,30 @@ class Agent:
         stats.update({
             'agent_name': self.name,
             'has_agent': self.agent is not None,
-            'config_status': str(self.config)
+            'config_status': str(self.config),
+            'chat_stats': dict(self.chat_stats)
         })
         return stats
 
+    def _get_retrieval_settings(self):
+        """Return (retriever top_k, node postprocessors, chunks returned) for document search."""
+        if not self.rerank_top_n:
+            return self.similarity_top_k, [], self.similarity_top_k
+        
+        # Retrieve a wide candidate set cheaply, then keep the best chunks by cross-encoder score
+        if self._reranker is None:
+            from llama_index.core.postprocessor import SentenceTransformerRerank
+            
+            self._reranker = SentenceTransformerRerank(model=self.reranker_model, top_n=self.rerank_top_n)
+        return max(self.rerank_candidates, self.rerank_top_n), [self._reranker], self.rerank_top_n
+
     def _create_query_tool(self, index) -> RetrieverTool:
         """Create a retriever tool from the index that returns raw document chunks."""
+        top_k, node_postprocessors, returned_k = self._get_retrieval_settings()
+        
         # Create retriever with configurable parameters
         retriever = index.as_retriever(
-            similarity_top_k=self.similarity_top_k,  # Use instance parameter
+            similarity_top_k=top_k,
             retriever_mode="default"
         )
         
@@ -138,45 +316,108 @@ class Agent:
             name="insurance_documents",
             description=(
                 f"Search through insurance documents and contracts to find relevant information. "
-                f"This tool retrieves the top {self.similarity_top_k} most relevant document chunks "
+                f"This tool retrieves the top {returned_k} most relevant document chunks "
                 f"(chunk_size={self.chunk_size}, overlap={self.chunk_overlap}) about insurance policies, "
                 f"coverage details, terms, conditions, and contract information. "
                 f"Returns unfiltered document content without summarization."
+            ),
+            node_postprocessors=node_postprocessors
+        )
+
+    def _create_filtered_query_tool(self, index) -> FunctionTool:
+        """Create a tool that searches only the chunks of one carrier."""
+        top_k, node_postprocessors, returned_k = self._get_retrieval_settings()
+        
+        def search(query: str, filters=None):
+            retriever = index.as_retriever(similarity_top_k=top_k, filters=filters)
+            nodes = retriever.retrieve(query)
+            for postprocessor in node_postprocessors:
+                nodes = postprocessor.postprocess_nodes(nodes, query_str=query)
+            return nodes
+        
+        def carrier_documents(query: str, carrier: str) -> str:
+            """Search the insurance documents of a single carrier."""
+            # Match the carrier name case-insensitively against the tagged carrier names
+            carrier_name = next((name for name in KNOWN_CARRIERS if name.lower() == carrier.strip().lower()), None)
+            
+            nodes = []
+            if carrier_name is not None:
+                # Metadata filters narrow the vector search itself (server-side for Pinecone)
+                nodes = search(query, MetadataFilters(filters=[MetadataFilter(key="carrier", value=carrier_name)]))
+            
+            # Unknown carriers and indexes ingested before chunks were tagged fall back to all documents
+            if not nodes:
+                nodes = search(query)
+                if not nodes:
+                    return "No relevant documents found."
+                return (
+                    f"No documents tagged for carrier '{carrier}'; results from all documents:\n\n"
+                    + "\n\n".join(node.get_content() for node in nodes)
+                )
+            return "\n\n".join(node.get_content() for node in nodes)
+        
+        return FunctionTool.from_defaults(
+            fn=carrier_documents,
+            name="carrier_documents",
+            description=(
+                f"Search the insurance documents of one carrier only. Use this instead of insurance_documents "
+                f"when the question is clearly about a specific carrier. `carrier` must be one of: "
+                f"{', '.join(KNOWN_CARRIERS)}. Retrieves the top {returned_k} most relevant chunks "
+                f"from that carrier's policies, endorsements, and contracts."
             )
         )
 
 
-    def _create_agent(self, tools):
-        """Create an OpenAI agent with the provided tools."""
-        # Use custom system prompt if provided, otherwise use default
+    def _get_system_prompt(self) -> str:
+        """Return the custom system prompt if provided, otherwise the default one."""
         if self.system_prompt_override:
-            system_prompt = self.system_prompt_override
-        else:
-            system_prompt = (
-                f"You are {self.name}, an AI assistant for Chartwell Insurance designed to help our customer service team "
-                "provide accurate and professional responses to customer queries and emails. "
-                f"\n\nYou have access to a document search tool that returns the top {self.similarity_top_k} most relevant "
-                f"document chunks (size: {self.chunk_size} chars, overlap: {self.chunk_overlap}) from our insurance files. "
-                "When you receive search results, carefully analyze ALL the retrieved content to provide comprehensive answers. "
-                "\n\nKey guidelines:"
-                "\n- Always search for relevant information before answering insurance-related questions"
-                "\n- Use all retrieved document chunks to form complete, accurate responses"
-                "\n- Preserve specific details, numbers, dates, and exact terms from the documents"
-                "\n- If multiple chunks contain related information, synthesize them together"
-                "\n- Reference specific documents or sections when relevant"
-                "\n- Maintain a professional tone representing Chartwell Insurance"
-                "\n- Be thorough and don't lose important details from the source material"
-                "\n\nDo not mention the search process explicitly - present information as your knowledge base. "
-                "Focus on being helpful, accurate, and professional in all interactions."
-            )
+            return self.system_prompt_override
         
-        self.agent = OpenAIAgent.from_tools(
+        return (
+            f"You are {self.name}, an AI assistant for Chartwell Insurance designed to help our customer service team "
+            "provide accurate and professional responses to customer queries and emails. "
+            f"\n\nYou have an optional document search tool that returns the top {self.rerank_top_n or self.similarity_top_k} most relevant "
+            f"document chunks (size: {self.chunk_size} chars, overlap: {self.chunk_overlap}) from our insurance files. "
+            "When you receive search results, carefully analyze ALL the retrieved content to provide comprehensive answers. "
+            "\n\nWhen to search:"
+            "\n- Call the tool for questions about specific policies, coverage, limits, exclusions, endorsements, "
+            "claims procedures, contract terms, or carriers"
+            "\n- When a question is about one specific carrier, use the carrier_documents tool to search only that "
+            "carrier's files"
+            "\n- Do not call the tool for greetings, thanks, questions about yourself, rewording or formatting a "
+            "previous answer, or general conversation"
+            "\n\nKey guidelines:"
+            "\n- Use all retrieved document chunks to form complete, accurate responses"
+            "\n- Preserve specific details, numbers, dates, and exact terms from the documents"
+            "\n- If multiple chunks contain related information, synthesize them together"
+            "\n- Reference specific documents or sections when relevant"
+            "\n- Maintain a professional tone representing Chartwell Insurance"
+            "\n- Be thorough and don't lose important details from the source material"
+            "\n\nDo not mention the search process explicitly - present information as your knowledge base. "
+            "Focus on being helpful, accurate, and professional in all interactions."
+        )
+
+    def _build_agent(self, tools):
+        """Build an OpenAI agent over the provided tools."""
+        # Imported here so importing this module stays cheap until an agent is built
+        from llama_index.agent.openai import OpenAIAgent
+        
+        return OpenAIAgent.from_tools(
             tools,
             llm=Settings.llm,
             verbose=True,
-            system_prompt=system_prompt
+            system_prompt=self._get_system_prompt()
         )
 
+    def _create_agent(self, tools):
+        """Create an OpenAI agent with the provided tools."""
+        self._tools = tools
+        self.agent = self._build_agent(tools)
+        
+        # Cached answers were produced against the previous index
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
     def __repr__(self):
         return f"Agent(name='{self.name}', storage='{self.vector_store_manager}', has_agent={self.agent is not None})"
 
@@ -3,10 +3,10 @@
 import os
 from dotenv import load_dotenv
 from llama_index.core import Settings
-from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.llms.openai import OpenAI
 from typing import Dict, Any
 
+from .embedding_cache import CachedEmbedding
+
 class Configuration:
     """Handles all configuration loading from environment variables or Streamlit secrets."""
     
@@ -78,6 +78,11 @@ class Configuration:
             # LLM configuration
             'llm_model': os.getenv('LLM_MODEL', 'gpt-4o'),
             'embedding_model': os.getenv('EMBEDDING_MODEL', 'text-embedding-ada-002'),
+            'embedding_dimensions': int(os.getenv('EMBEDDING_DIMENSIONS')) if os.getenv('EMBEDDING_DIMENSIONS') else None,
+            'embed_batch_size': int(os.getenv('EMBED_BATCH_SIZE', '100')),
+            'embed_num_workers': int(os.getenv('EMBED_NUM_WORKERS', '8')),
+            'embed_cache_path': os.getenv('EMBED_CACHE_PATH', '.embed_cache.sqlite'),
+            'openai_max_retries': int(os.getenv('OPENAI_MAX_RETRIES', '6')),
             
             # Agent configuration
             'agent_verbose': os.getenv('AGENT_VERBOSE', 'true').lower() == 'true',
@@ -105,6 +110,11 @@ class Configuration:
                 # LLM configuration
                 'llm_model': st.secrets.get('LLM_MODEL', 'gpt-4o'),
                 'embedding_model': st.secrets.get('EMBEDDING_MODEL', 'text-embedding-ada-002'),
+                'embedding_dimensions': int(st.secrets['EMBEDDING_DIMENSIONS']) if st.secrets.get('EMBEDDING_DIMENSIONS') else None,
+                'embed_batch_size': int(st.secrets.get('EMBED_BATCH_SIZE', 100)),
+                'embed_num_workers': int(st.secrets.get('EMBED_NUM_WORKERS', 8)),
+                'embed_cache_path': st.secrets.get('EMBED_CACHE_PATH', '.embed_cache.sqlite'),
+                'openai_max_retries': int(st.secrets.get('OPENAI_MAX_RETRIES', 6)),
                 
                 # Agent configuration
                 'agent_verbose': st.secrets.get('AGENT_VERBOSE', 'true').lower() == 'true',
@@ -121,15 +131,35 @@ class Configuration:
             print("⚠️  Warning: OpenAI API key not found. Some features may not work.")
             return
         
+        # OpenAI integrations are only imported once there is a key to configure them with
+        from llama_index.embeddings.openai import OpenAIEmbedding
+        from llama_index.llms.openai import OpenAI
+        
+        # The OpenAI client retries rate limits, 5xx and connection errors with
+        # exponential backoff and jitter, honoring Retry-After
         Settings.llm = OpenAI(
             model=self.config['llm_model'],
-            api_key=self.config['openai_api_key']
+            api_key=self.config['openai_api_key'],
+            max_retries=self.config['openai_max_retries']
         )
-        Settings.embed_model = OpenAIEmbedding(
+        # Send many chunks per embedding request and run batches concurrently
+        embed_model = OpenAIEmbedding(
             model=self.config['embedding_model'],
-            api_key=self.config['openai_api_key']
+            api_key=self.config['openai_api_key'],
+            dimensions=self.config.get('embedding_dimensions'),
+            embed_batch_size=self.config['embed_batch_size'],
+            num_workers=self.config['embed_num_workers'],
+            max_retries=self.config['openai_max_retries']
         )
         
+        # Reuse embeddings of previously ingested chunks unless caching is disabled
+        if self.config.get('embed_cache_path'):
+            namespace = f"{self.config['embedding_model']}:{self.config.get('embedding_dimensions') or 'default'}"
+            embed_model = CachedEmbedding(
+                embed_model, cache_path=self.config['embed_cache_path'], namespace=namespace
+            )
+        Settings.embed_model = embed_model
+        
         print(f"✅ LlamaIndex configured with {self.config['llm_model']}")
     
     def get(self, key: str, default: Any = None) -> Any:
@@ -141,7 +171,11 @@ class Configuration:
         return {
             'api_key': self.config.get('openai_api_key'),
             'llm_model': self.config.get('llm_model'),
-            'embedding_model': self.config.get('embedding_model')
+            'embedding_model': self.config.get('embedding_model'),
+            'embedding_dimensions': self.config.get('embedding_dimensions'),
+            'embed_batch_size': self.config.get('embed_batch_size'),
+            'embed_num_workers': self.config.get('embed_num_workers'),
+            'max_retries': self.config.get('openai_max_retries')
         }
     
     def get_pinecone_config(self) -> Dict[str, str]:
@@ -151,7 +185,8 @@ class Configuration:
             'index_name': self.config.get('pinecone_index_name'),
             'namespace': self.config.get('pinecone_namespace'),
             'cloud': self.config.get('pinecone_cloud'),
-            'region': self.config.get('pinecone_region')
+            'region': self.config.get('pinecone_region'),
+            'dimension': self.config.get('embedding_dimensions') or 1536
         }
     
     def get_agent_config(self) -> Dict[str, Any]:
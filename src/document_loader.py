@@ -1,30 +1,194 @@
 """Document loading utilities for the RAG Agent."""
 
+import importlib.util
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
-import pandas as pd
-from llama_index.readers.file import PDFReader
+from typing import Dict, Iterator, List, Optional, Tuple
 from llama_index.core import Document
 from llama_index.core.node_parser import SimpleNodeParser
 
+# pyarrow parses large CSVs several times faster than the default C engine
+_CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+
+# CSVs above this size are streamed in row batches to bound memory
+_CSV_STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+_CSV_CHUNK_ROWS = 10_000
+
+# Carriers recognized in file names, used to tag chunks for filtered search
+KNOWN_CARRIERS = ("Berkley One", "Chubb")
+
+# Bump when the stored chunk format or metadata changes so cached chunks are rebuilt
+_CHUNK_CACHE_VERSION = 2
+
+# PyMuPDF extracts PDF text in C, much faster than the pure-Python pypdf reader
+_HAS_PYMUPDF = importlib.util.find_spec("pymupdf") is not None
+
+
+class PyMuPDFReader:
+    """PyMuPDF-backed PDF reader producing one Document per page, like PDFReader."""
+    
+    def load_data(self, file_path: Path) -> List[Document]:
+        """Load one Document per page of a PDF file."""
+        import pymupdf
+        
+        file_path = Path(file_path)
+        pdf = pymupdf.open(file_path)
+        try:
+            return [
+                Document(
+                    text=page.get_text("text"),
+                    metadata={"page_label": str(page_number), "file_name": file_path.name}
+                )
+                for page_number, page in enumerate(pdf, start=1)
+            ]
+        finally:
+            pdf.close()
+
+
+def _load_file_worker(file_path: Path, chunk_size: int, chunk_overlap: int, chunker: str) -> Tuple[List[Document], int]:
+    """
+    Load and chunk a single file inside a worker process.
+    
+    Only plain values cross the process boundary; the reader and node parser
+    are built inside the worker.
+    
+    Returns:
+        Tuple of (chunked documents, number of raw documents loaded)
+    """
+    loader = DocumentLoader(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, max_workers=1, chunker=chunker, cache_path=None
+    )
+    file_docs = loader._load_single_file(file_path)
+    return loader._apply_chunking(file_docs), len(file_docs)
+
 
 class DocumentLoader:
     """Handles loading documents from various file types."""
     
-    def __init__(self, chunk_size: int = 512, chunk_overlap: int = 50):
-        self.pdf_reader = PDFReader()
+    def __init__(
+        self, 
+        chunk_size: int = 512, 
+        chunk_overlap: int = 50, 
+        max_workers: Optional[int] = None,
+        chunker: str = "simple",
+        cache_path: Optional[str] = ".doc_cache.sqlite"
+    ):
+        """
+        Initialize the document loader.
+        
+        Args:
+            chunk_size: Target chunk size in tokens
+            chunk_overlap: Overlap between consecutive chunks in tokens (ignored by
+                Chonkie chunkers without overlap support, e.g. "recursive" and "semantic")
+            max_workers: Worker processes used to load files (defaults to CPU count)
+            chunker: "simple" for SimpleNodeParser, or a Chonkie chunker such as
+                "recursive" or "semantic" (requires llama-index-node-parser-chonkie)
+            cache_path: SQLite file caching chunks per file by modification time (None disables)
+        """
         self.supported_extensions = {'.pdf', '.csv'}
+        self.chunker = chunker
+        if chunker != "simple":
+            self._check_chonkie_chunker(chunker)
+        self.cache_path = cache_path
         
         # Store chunking parameters
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         
-        # Initialize node parser with custom settings
-        self.node_parser = SimpleNodeParser.from_defaults(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separator="\n\n"  # Split on paragraphs for insurance docs
-        )
+        # Number of worker processes used to load files (defaults to CPU count)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        
+        # Reader and node parser are built lazily so worker processes only
+        # need the plain chunking parameters above
+        self._pdf_reader = None
+        self._node_parser = None
+        
+        # One chunk cache connection per loader, shared by the lookups and stores of every file
+        self._cache_lock = threading.Lock()
+        self._cache_conn = self._open_cache_connection()
+    
+    @property
+    def pdf_reader(self):
+        """PDF reader, created on first use. Uses PyMuPDF when installed, otherwise PDFReader."""
+        if self._pdf_reader is None:
+            if _HAS_PYMUPDF:
+                self._pdf_reader = PyMuPDFReader()
+            else:
+                from llama_index.readers.file import PDFReader
+                
+                self._pdf_reader = PDFReader()
+        return self._pdf_reader
+    
+    @property
+    def node_parser(self):
+        """Node parser with the configured chunking settings, created on first use."""
+        if self._node_parser is None:
+            if self.chunker == "simple":
+                self._node_parser = SimpleNodeParser.from_defaults(
+                    chunk_size=self.chunk_size,
+                    chunk_overlap=self.chunk_overlap,
+                    separator="\n\n"  # Split on paragraphs for insurance docs
+                )
+            else:
+                # Rust-backed Chonkie chunkers share the node parser interface
+                try:
+                    from llama_index.node_parser.chonkie import Chunker
+                except ImportError:
+                    raise ImportError(
+                        "Chonkie chunkers require: pip install llama-index-node-parser-chonkie chonkie"
+                    )
+                self._node_parser = Chunker(chunker=self._build_chonkie_chunker())
+        return self._node_parser
+    
+    @staticmethod
+    def _check_chonkie_chunker(chunker: str) -> None:
+        """Fail fast on an unknown chunker name instead of on every file during ingest."""
+        try:
+            from chonkie.pipeline import ComponentRegistry
+        except ImportError:
+            raise ImportError("Chonkie chunkers require: pip install llama-index-node-parser-chonkie chonkie")
+        try:
+            ComponentRegistry.get_chunker(chunker)
+        except ValueError:
+            raise ValueError(f"Unknown chunker '{chunker}'. Use 'simple' or a Chonkie chunker such as 'recursive' or 'semantic'")
+    
+    def _build_chonkie_chunker(self):
+        """Build the configured Chonkie chunker with only the settings its class accepts."""
+        from chonkie.pipeline import ComponentRegistry
+        
+        chunker_class = ComponentRegistry.get_chunker(self.chunker).component_class
+        params = inspect.signature(chunker_class.__init__).parameters
+        
+        kwargs = {}
+        if 'chunk_size' in params:
+            kwargs['chunk_size'] = self.chunk_size
+        if 'chunk_overlap' in params:
+            kwargs['chunk_overlap'] = self.chunk_overlap
+        elif self.chunk_overlap:
+            print(f"Note: the {self.chunker} chunker does not support overlap; chunk_overlap={self.chunk_overlap} is ignored")
+        
+        # Chonkie counts characters by default; count the same tokens as SimpleNodeParser instead
+        if 'tokenizer' in params:
+            encoding = self._get_token_encoding()
+            if encoding is not None:
+                kwargs['tokenizer'] = encoding
+            else:
+                print(f"Note: no tiktoken encoding available; the {self.chunker} chunker's chunk_size counts characters")
+        
+        return chunker_class(**kwargs)
+    
+    @staticmethod
+    def _get_token_encoding():
+        """The tiktoken encoding behind LlamaIndex's global tokenizer, if it is one."""
+        from llama_index.core.utils import get_tokenizer
+        
+        tokenizer = get_tokenizer()
+        return getattr(getattr(tokenizer, 'func', None), '__self__', None)
     
     def load_from_directory(self, directory_path: str) -> List[Document]:
         """
@@ -36,7 +200,18 @@ class DocumentLoader:
         Returns:
             List of Document objects
         """
-        documents = []
+        return self.load_files(self.list_supported_files(directory_path))
+    
+    def list_supported_files(self, directory_path: str) -> List[Path]:
+        """
+        List the supported files in a directory, sorted by path.
+        
+        Args:
+            directory_path: Path to directory containing documents
+            
+        Returns:
+            List of file paths
+        """
         directory = Path(directory_path)
         
         if not directory.exists():
@@ -45,33 +220,170 @@ class DocumentLoader:
         if not directory.is_dir():
             raise ValueError(f"Path is not a directory: {directory_path}")
         
-        # Process all files in directory
-        for file_path in directory.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() in self.supported_extensions:
+        # scandir answers is_file() from the directory listing and Paths are only built for matching entries
+        with os.scandir(directory) as entries:
+            return sorted(
+                Path(entry.path) for entry in entries
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.supported_extensions
+            )
+    
+    def load_files(self, file_paths: List[Path]) -> List[Document]:
+        """
+        Load and chunk the given files, in parallel when there are several.
+        
+        Args:
+            file_paths: Paths of supported files to load
+            
+        Returns:
+            List of chunked Document objects, in file order
+        """
+        documents = []
+        for file_docs in self.load_files_by_path(file_paths).values():
+            documents.extend(file_docs)
+        return documents
+    
+    def load_files_by_path(self, file_paths: List[Path]) -> Dict[Path, List[Document]]:
+        """
+        Load and chunk the given files, like load_files, grouping the chunks by file.
+        
+        Args:
+            file_paths: Paths of supported files to load
+            
+        Returns:
+            Mapping of each file that loaded successfully to its chunked Document objects,
+            in file order. Files that failed to load are left out.
+        """
+        # Reuse chunks of files that are unchanged since they were last parsed
+        results = {}
+        pending = []
+        for i, file_path in enumerate(file_paths):
+            cached_docs = self._get_cached_chunks(file_path)
+            if cached_docs is not None:
+                results[i] = cached_docs
+                print(f"Loaded {len(cached_docs)} cached chunks for {file_path.name}")
+            else:
+                pending.append(i)
+        
+        if self.max_workers == 1 or len(pending) <= 1:
+            for i in pending:
+                file_path = file_paths[i]
                 try:
                     file_docs = self._load_single_file(file_path)
                     # Apply chunking to the loaded documents
                     chunked_docs = self._apply_chunking(file_docs)
-                    documents.extend(chunked_docs)
+                    results[i] = chunked_docs
+                    self._store_cached_chunks(file_path, chunked_docs)
                     print(f"Loaded and chunked {len(file_docs)} documents from {file_path.name} into {len(chunked_docs)} chunks")
                 except Exception as e:
                     print(f"Warning: Failed to load {file_path.name}: {e}")
+        else:
+            # Parse and chunk files across worker processes, keeping file order in the result
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+                futures = {
+                    executor.submit(
+                        _load_file_worker, file_paths[i], self.chunk_size, self.chunk_overlap, self.chunker
+                    ): i
+                    for i in pending
+                }
+                for future in as_completed(futures):
+                    i = futures[future]
+                    file_path = file_paths[i]
+                    try:
+                        chunked_docs, num_file_docs = future.result()
+                        results[i] = chunked_docs
+                        self._store_cached_chunks(file_path, chunked_docs)
+                        print(f"Loaded and chunked {num_file_docs} documents from {file_path.name} into {len(chunked_docs)} chunks")
+                    except Exception as e:
+                        print(f"Warning: Failed to load {file_path.name}: {e}")
         
-        return documents
+        return {file_paths[i]: results[i] for i in sorted(results)}
+    
+    def _file_version(self, file_path: Path) -> str:
+        """Identify a file version and the reader used to extract its text."""
+        stat = file_path.stat()
+        return f"v{_CHUNK_CACHE_VERSION}:{stat.st_mtime_ns}:{stat.st_size}:{type(self.pdf_reader).__name__}"
+    
+    def _chunk_settings(self) -> str:
+        """Identify the chunking settings applied to a file."""
+        return f"{self.chunker}:{self.chunk_size}:{self.chunk_overlap}"
+    
+    def _open_cache_connection(self) -> Optional[sqlite3.Connection]:
+        """Open the chunk cache database and create its table, if caching is enabled."""
+        if not self.cache_path:
+            return None
+        try:
+            conn = sqlite3.connect(self.cache_path, timeout=30, check_same_thread=False)
+            # WAL lets loaders in other processes read while one writes; NORMAL skips an fsync per commit
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                # One row per file and chunking config, so different settings (as in tuning runs) don't evict each other
+                conn.execute("DROP TABLE IF EXISTS chunks")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS file_chunks ("
+                    "path TEXT NOT NULL, settings TEXT NOT NULL, file_version TEXT NOT NULL, documents BLOB NOT NULL, "
+                    "PRIMARY KEY (path, settings))"
+                )
+            return conn
+        except Exception as e:
+            print(f"Warning: Could not open chunk cache {self.cache_path}: {e}")
+            return None
+    
+    def _get_cached_chunks(self, file_path: Path) -> Optional[List[Document]]:
+        """Return cached chunks for a file if it has not changed since it was cached."""
+        if self._cache_conn is None:
+            return None
+        try:
+            with self._cache_lock:
+                row = self._cache_conn.execute(
+                    "SELECT documents FROM file_chunks WHERE path = ? AND settings = ? AND file_version = ?",
+                    (str(file_path.resolve()), self._chunk_settings(), self._file_version(file_path))
+                ).fetchone()
+            if row is not None:
+                return pickle.loads(row[0])
+        except Exception as e:
+            print(f"Warning: Could not read chunk cache for {file_path.name}: {e}")
+        return None
+    
+    def _store_cached_chunks(self, file_path: Path, documents: List[Document]) -> None:
+        """Cache the chunks produced for a file, dropping entries for older versions of it."""
+        if self._cache_conn is None:
+            return
+        try:
+            path, file_version = str(file_path.resolve()), self._file_version(file_path)
+            with self._cache_lock, self._cache_conn:
+                self._cache_conn.execute(
+                    "DELETE FROM file_chunks WHERE path = ? AND file_version != ?", (path, file_version)
+                )
+                self._cache_conn.execute(
+                    "INSERT OR REPLACE INTO file_chunks (path, settings, file_version, documents) VALUES (?, ?, ?, ?)",
+                    (path, self._chunk_settings(), file_version, pickle.dumps(documents))
+                )
+        except Exception as e:
+            print(f"Warning: Could not write chunk cache for {file_path.name}: {e}")
     
     def _apply_chunking(self, documents: List[Document]) -> List[Document]:
         """Apply chunking to documents using the configured node parser."""
+        chunk_metadata = {'chunk_size': self.chunk_size, 'chunk_overlap': self.chunk_overlap}
+        
+        # Documents that already fit in one chunk (~4 chars per token) skip the parser entirely
+        long_docs = [doc for doc in documents if len(doc.text) // 4 > self.chunk_size]
+        
+        # Parse the remaining documents in one call; each node carries its source document's metadata
+        nodes_by_doc = {}
+        if long_docs:
+            for node in self.node_parser.get_nodes_from_documents(long_docs):
+                nodes_by_doc.setdefault(node.ref_doc_id, []).append(node)
+        
         chunked_docs = []
         for doc in documents:
-            # Convert document to nodes and back to documents
-            nodes = self.node_parser.get_nodes_from_documents([doc])
-            for node in nodes:
-                # Create new document from node
-                chunked_doc = Document(
-                    text=node.text,
-                    metadata={**doc.metadata, 'chunk_size': self.chunk_size, 'chunk_overlap': self.chunk_overlap}
+            if len(doc.text) // 4 > self.chunk_size:
+                chunked_docs.extend(
+                    Document(text=node.text, metadata={**node.metadata, **chunk_metadata})
+                    for node in nodes_by_doc.get(doc.doc_id, [])
                 )
-                chunked_docs.append(chunked_doc)
+            else:
+                chunked_docs.append(Document(text=doc.text, metadata={**doc.metadata, **chunk_metadata}))
         return chunked_docs
     
     def _load_single_file(self, file_path: Path) -> List[Document]:
@@ -79,11 +391,37 @@ class DocumentLoader:
         extension = file_path.suffix.lower()
         
         if extension == '.pdf':
-            return self._load_pdf(file_path)
+            documents = self._load_pdf(file_path)
         elif extension == '.csv':
-            return self._load_csv(file_path)
+            documents = self._load_csv(file_path)
         else:
             raise ValueError(f"Unsupported file type: {extension}")
+        
+        # Tag every document so retrieval can filter by carrier and document type
+        source_metadata = self._infer_source_metadata(file_path)
+        for doc in documents:
+            doc.metadata.update(source_metadata)
+        return documents
+    
+    @staticmethod
+    def _infer_source_metadata(file_path: Path) -> dict:
+        """Infer carrier and document type from a file name."""
+        name = file_path.stem.lower()
+        
+        carrier = next((c for c in KNOWN_CARRIERS if c.lower() in name), "unknown")
+        
+        if file_path.suffix.lower() == '.csv':
+            doc_type = "qa"
+        elif "contract" in name:
+            doc_type = "contract"
+        elif "reference guide" in name:
+            doc_type = "reference_guide"
+        elif "polic" in name or "endorsement" in name:
+            doc_type = "policy"
+        else:
+            doc_type = "other"
+        
+        return {"carrier": carrier, "doc_type": doc_type}
     
     def _load_pdf(self, file_path: Path) -> List[Document]:
         """Load documents from a PDF file."""
@@ -94,39 +432,52 @@ class DocumentLoader:
         Load documents from a 2-column CSV file.
         First column is treated as key, second as value.
         """
-        documents = []
-        
         try:
-            df = pd.read_csv(file_path)
-            
+            return list(self._iter_csv(file_path))
+        except Exception as e:
+            raise ValueError(f"Error processing CSV file {file_path}: {e}")
+    
+    def _iter_csv(self, file_path: Path) -> Iterator[Document]:
+        """
+        Yield documents from a 2-column CSV file.
+        
+        Large files are read in fixed-size row batches so only one batch of the
+        DataFrame is held in memory at a time.
+        """
+        import pandas as pd
+        
+        if file_path.stat().st_size > _CSV_STREAM_THRESHOLD_BYTES:
+            # pyarrow does not support chunked reads, so stream with the C engine
+            frames = pd.read_csv(file_path, dtype=str, chunksize=_CSV_CHUNK_ROWS)
+        else:
+            frames = [pd.read_csv(file_path, dtype=str, engine=_CSV_ENGINE)]
+        
+        source = str(file_path)
+        for df in frames:
             if df.shape[1] < 2:
                 print(f"Warning: CSV {file_path.name} has less than 2 columns, skipping")
-                return documents
+                return
             
-            # Process each row as key-value pair
-            for idx, row in df.iterrows():
-                key = str(row.iloc[0]) if pd.notna(row.iloc[0]) else f"row_{idx}_key"
-                value = str(row.iloc[1]) if pd.notna(row.iloc[1]) else f"row_{idx}_value"
-                
-                doc = Document(
-                    text=f"{key}: {value}",
+            # Build key/value/text columns in one vectorized pass, filling missing cells with placeholders
+            row_labels = pd.Series(df.index, index=df.index).astype(str)
+            keys = df.iloc[:, 0].fillna("row_" + row_labels + "_key")
+            values = df.iloc[:, 1].fillna("row_" + row_labels + "_value")
+            texts = keys + ": " + values
+            
+            for idx, key, value, text in zip(df.index, keys.to_numpy(), values.to_numpy(), texts.to_numpy()):
+                yield Document(
+                    text=text,
                     metadata={
                         "key": key,
                         "value": value,
-                        "source": str(file_path),
+                        "source": source,
                         "row_index": idx
                     }
                 )
-                documents.append(doc)
-                
-        except Exception as e:
-            raise ValueError(f"Error processing CSV file {file_path}: {e}")
-        
-        return documents
     
     def get_supported_extensions(self) -> set:
         """Get set of supported file extensions."""
         return self.supported_extensions.copy()
     
     def __repr__(self):
-        return f"DocumentLoader(supported_extensions={self.supported_extensions})"
+        return f"DocumentLoader(supported_extensions={self.supported_extensions}, chunker={self.chunker}, max_workers={self.max_workers})"
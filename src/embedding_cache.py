@@ -0,0 +1,146 @@
+"""Persistent embedding cache for the RAG Agent."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps an embedding model with an on-disk cache keyed by text hash.
+
+    Text embeddings are looked up in a local SQLite file before calling the
+    inner model, so re-ingesting unchanged documents costs no API calls.
+    Vectors are stored as packed float32 bytes.
+    Entries are namespaced (by model name unless a namespace is given) so
+    switching models never returns stale vectors. Query embeddings are passed
+    straight through.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _conn: sqlite3.Connection = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr()
+    _namespace: str = PrivateAttr()
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        cache_path: str = ".embed_cache.sqlite",
+        namespace: Optional[str] = None,
+        **kwargs
+    ):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            num_workers=inner.num_workers,
+            **kwargs
+        )
+        self._inner = inner
+        self._namespace = namespace or inner.model_name
+        self._lock = threading.Lock()
+        # Tuning worker processes share this file, so wait for other writers instead of failing
+        self._conn = sqlite3.connect(cache_path, timeout=30, check_same_thread=False)
+        # WAL lets other processes read while one writes; NORMAL skips an fsync per commit
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, embedding BLOB NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        """Hash text into a cache key."""
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _encode(embedding: Embedding) -> bytes:
+        """Pack an embedding as float32 bytes (OpenAI vectors are float32 already)."""
+        return np.asarray(embedding, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def _decode(value) -> Embedding:
+        """Unpack a stored embedding, including ones written as JSON by older versions."""
+        if isinstance(value, str):
+            return json.loads(value)
+        return np.frombuffer(value, dtype=np.float32).tolist()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, Embedding]:
+        """Fetch cached embeddings for the given keys."""
+        found = {}
+        try:
+            with self._lock:
+                for key in set(keys):
+                    row = self._conn.execute(
+                        "SELECT embedding FROM embeddings WHERE namespace = ? AND key = ?",
+                        (self._namespace, key)
+                    ).fetchone()
+                    if row is not None:
+                        found[key] = self._decode(row[0])
+        except Exception as e:
+            print(f"Warning: Could not read embedding cache: {e}")
+        return found
+
+    def _store(self, keys: List[str], embeddings: List[Embedding]) -> None:
+        """Write newly computed embeddings to the cache; a failed write never loses the embeddings."""
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (namespace, key, embedding) VALUES (?, ?, ?)",
+                    [(self._namespace, key, self._encode(emb)) for key, emb in zip(keys, embeddings)]
+                )
+        except Exception as e:
+            print(f"Warning: Could not write {len(keys)} embeddings to cache: {e}")
+
+    def _split_misses(self, texts: List[str]):
+        """Return cache keys, cached hits, and the texts that still need embedding."""
+        keys = [self._hash(text) for text in texts]
+        cached = self._lookup(keys)
+
+        miss_keys, miss_texts, seen = [], [], set(cached)
+        for key, text in zip(keys, texts):
+            if key not in seen:
+                seen.add(key)
+                miss_keys.append(key)
+                miss_texts.append(text)
+        return keys, cached, miss_keys, miss_texts
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, cached, miss_keys, miss_texts = self._split_misses(texts)
+        if miss_texts:
+            new_embeddings = self._inner._get_text_embeddings(miss_texts)
+            self._store(miss_keys, new_embeddings)
+            cached.update(zip(miss_keys, new_embeddings))
+        return [cached[key] for key in keys]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, cached, miss_keys, miss_texts = self._split_misses(texts)
+        if miss_texts:
+            new_embeddings = await self._inner._aget_text_embeddings(miss_texts)
+            self._store(miss_keys, new_embeddings)
+            cached.update(zip(miss_keys, new_embeddings))
+        return [cached[key] for key in keys]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._inner._get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self._inner._aget_query_embedding(query)
@@ -0,0 +1,90 @@
+"""Semantic response cache for the RAG Agent."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Caches agent responses keyed by query embedding.
+
+    A new query whose embedding has cosine similarity at or above the
+    threshold with a cached query returns the cached response. Entries expire
+    after ttl_seconds and the least recently used entry is evicted once
+    max_size is reached.
+
+    With text-embedding-ada-002 unrelated questions often score above 0.9 and
+    questions differing only in a name (e.g. the carrier) can reach 0.95, so
+    the default threshold is 0.98.
+
+    One cache can be shared by agent sessions on different threads.
+    """
+
+    def __init__(self, threshold: float = 0.98, max_size: int = 256, ttl_seconds: Optional[float] = 3600):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        # entry id -> (normalized embedding, response, timestamp), oldest use first
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, embedding: List[float]) -> Optional[str]:
+        """Return the cached response for the closest query above the threshold, if any."""
+        query = self._normalize(embedding)
+        with self._lock:
+            self._evict_expired()
+            if not self._entries:
+                return None
+
+            ids = list(self._entries.keys())
+            matrix = np.stack([self._entries[i][0] for i in ids])
+            scores = matrix @ query
+
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            entry_id = ids[best]
+            self._entries.move_to_end(entry_id)
+            return self._entries[entry_id][1]
+
+    def add(self, embedding: List[float], response: str) -> None:
+        """Store a response for the given query embedding."""
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._entries[self._next_id] = (vector, response, time.time())
+            self._next_id += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def _evict_expired(self) -> None:
+        """Drop entries older than the TTL."""
+        if self.ttl_seconds is None:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        expired = [i for i, (_, _, ts) in self._entries.items() if ts < cutoff]
+        for entry_id in expired:
+            del self._entries[entry_id]
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"SemanticCache(entries={len(self._entries)}, threshold={self.threshold})"
@@ -1,10 +1,21 @@
 """Vector store management for the RAG Agent."""
 
-from typing import List, Optional
-from llama_index.core import VectorStoreIndex, StorageContext
-from llama_index.vector_stores.pinecone import PineconeVectorStore
+from typing import TYPE_CHECKING, List, Optional
+from llama_index.core import Settings, VectorStoreIndex, StorageContext
+from llama_index.core.ingestion import run_transformations
 from llama_index.core import Document
-from pinecone import Pinecone, ServerlessSpec
+
+if TYPE_CHECKING:
+    from llama_index.vector_stores.pinecone import PineconeVectorStore
+
+# Process-wide Pinecone clients keyed by API key, so every manager shares one connection pool
+_PINECONE_CLIENTS = {}
+
+# Process-wide Pinecone index handles keyed by (API key, index name)
+_PINECONE_INDEXES = {}
+
+# (API key, index name) pairs already confirmed to exist, to skip repeated list_indexes() calls
+_KNOWN_INDEXES = set()
 
 
 class VectorStoreManager:
@@ -15,12 +26,18 @@ class VectorStoreManager:
         use_pinecone: bool = False, 
         pinecone_config: Optional[dict] = None,
         chunk_size: int = 512,
-        chunk_overlap: int = 50
+        chunk_overlap: int = 50,
+        upsert_batch_size: int = 100,
+        insert_batch_size: int = 2048
     ):
         self.use_pinecone = use_pinecone
         self.pinecone_config = pinecone_config or {}
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        
+        # Vectors per Pinecone upsert request and nodes embedded per index insert batch
+        self.upsert_batch_size = upsert_batch_size
+        self.insert_batch_size = insert_batch_size
         self.index = None
         self._pinecone_client = None
     
@@ -45,16 +62,51 @@ class VectorStoreManager:
             storage_context = StorageContext.from_defaults(vector_store=vector_store)
             self.index = VectorStoreIndex.from_documents(
                 documents, 
-                storage_context=storage_context
+                storage_context=storage_context,
+                insert_batch_size=self.insert_batch_size,
+                show_progress=True,
+                use_async=True
             )
             print(f"Created Pinecone index with {len(documents)} documents")
         else:
             # Create local vector index
-            self.index = VectorStoreIndex.from_documents(documents)
+            self.index = VectorStoreIndex.from_documents(
+                documents,
+                show_progress=True,
+                use_async=True
+            )
             print(f"Created local vector index with {len(documents)} documents")
         
         return self.index
     
+    def add_documents(self, documents: List[Document]) -> VectorStoreIndex:
+        """
+        Add documents to the current index, creating the index if there is none yet.
+        
+        Only the given documents are embedded, so incremental ingests cost time
+        proportional to the new chunks rather than the whole corpus.
+        
+        Args:
+            documents: List of already-chunked Document objects to add
+            
+        Returns:
+            VectorStoreIndex instance
+        """
+        if self.index is None:
+            return self.create_index(documents)
+        
+        if not documents:
+            raise ValueError("No documents provided to add to index")
+        
+        # Apply the same Settings transformations as from_documents in create_index, then
+        # insert all resulting nodes in one batch instead of one insert per document
+        for doc in documents:
+            self.index.docstore.set_document_hash(doc.id_, doc.hash)
+        nodes = run_transformations(documents, Settings.transformations, show_progress=True)
+        self.index.insert_nodes(nodes, show_progress=True)
+        print(f"Added {len(documents)} documents to existing {'Pinecone' if self.use_pinecone else 'local'} index")
+        return self.index
+    
     def connect_to_existing_index(self) -> VectorStoreIndex:
         """
         Connect to an existing Pinecone index without uploading new documents.
@@ -81,8 +133,12 @@ class VectorStoreManager:
         print("Successfully connected to existing Pinecone index")
         return self.index
     
-    def _get_pinecone_vector_store(self) -> PineconeVectorStore:
+    def _get_pinecone_vector_store(self) -> "PineconeVectorStore":
         """Create or get existing Pinecone vector store."""
+        # Pinecone is only imported when Pinecone storage is actually used
+        from llama_index.vector_stores.pinecone import PineconeVectorStore
+        from pinecone import Pinecone
+        
         # Validate configuration
         api_key = self.pinecone_config.get('api_key')
         if not api_key:
@@ -92,39 +148,54 @@ class VectorStoreManager:
         namespace = self.pinecone_config.get('namespace', 'llama-namespace')
         cloud = self.pinecone_config.get('cloud', 'aws')
         region = self.pinecone_config.get('region', 'us-east-1')
+        dimension = self.pinecone_config.get('dimension', 1536)
         
-        # Initialize Pinecone client if not already done
-        if self._pinecone_client is None:
-            self._pinecone_client = Pinecone(api_key=api_key)
+        # Reuse the shared Pinecone client for this API key
+        if api_key not in _PINECONE_CLIENTS:
+            _PINECONE_CLIENTS[api_key] = Pinecone(api_key=api_key, pool_threads=32)
+        self._pinecone_client = _PINECONE_CLIENTS[api_key]
         
         # Create index if it doesn't exist
-        self._ensure_index_exists(index_name, cloud, region)
+        self._ensure_index_exists(index_name, cloud, region, dimension)
         
-        # Get the index and create vector store
-        pinecone_index = self._pinecone_client.Index(index_name)
+        # Get the index handle once and create vector store
+        index_key = (api_key, index_name)
+        if index_key not in _PINECONE_INDEXES:
+            _PINECONE_INDEXES[index_key] = self._pinecone_client.Index(index_name)
+        pinecone_index = _PINECONE_INDEXES[index_key]
         vector_store = PineconeVectorStore(
             pinecone_index=pinecone_index,
-            namespace=namespace
+            namespace=namespace,
+            batch_size=self.upsert_batch_size,
+            add_sparse_vector=False
         )
         
         print(f"Using Pinecone index '{index_name}' with namespace '{namespace}'")
         return vector_store
     
-    def _ensure_index_exists(self, index_name: str, cloud: str, region: str):
+    def _ensure_index_exists(self, index_name: str, cloud: str, region: str, dimension: int = 1536):
         """Ensure the Pinecone index exists, create if it doesn't."""
+        api_key = self.pinecone_config.get('api_key')
+        if (api_key, index_name) in _KNOWN_INDEXES:
+            return
+        
         existing_indexes = [index.name for index in self._pinecone_client.list_indexes()]
+        _KNOWN_INDEXES.update((api_key, name) for name in existing_indexes)
         
         if index_name not in existing_indexes:
+            from pinecone import ServerlessSpec
+            
             print(f"Creating new Pinecone index: {index_name}")
             self._pinecone_client.create_index(
                 name=index_name,
-                dimension=1536,  # OpenAI embeddings dimension
+                dimension=dimension,  # Must match the embedding model's output size
                 metric='cosine',
                 spec=ServerlessSpec(
                     cloud=cloud,
                     region=region
                 )
             )
+            _KNOWN_INDEXES.add((api_key, index_name))
             print(f"Successfully created Pinecone index: {index_name}")
         else:
             print(f"Using existing Pinecone index: {index_name}")
@@ -135,8 +206,10 @@ class VectorStoreManager:
     
     def reset(self):
         """Reset the vector store manager."""
+        # The shared Pinecone client is kept so reconnecting reuses its connections,
+        # but index existence is checked again on the next connect
         self.index = None
-        self._pinecone_client = None
+        _KNOWN_INDEXES.clear()
         print("Vector store manager reset")
     
     def get_stats(self) -> dict:
@@ -22,9 +22,11 @@ if __name__ == "__main__":
     parser.add_argument('--questions-file', type=str, 
                        default='tuning/data/eval/sample_questions.csv',
                        help='Path to evaluation questions CSV file')
+    parser.add_argument('--processes', type=int, default=None,
+                       help='Worker processes for evaluating chunking configurations in parallel (default 1)')
     
     args = parser.parse_args()
     
     # Initialize and run tuner
     tuner = HyperparameterTuner(questions_file=args.questions_file)
-    tuner.run_tuning(iterations=args.iterations)
+    tuner.run_tuning(iterations=args.iterations, processes=args.processes)
@@ -3,12 +3,22 @@ Evaluation components for hyperparameter tuning.
 Handles relevancy and faithfulness evaluation of agent responses.
 """
 
+import asyncio
 import time
-import difflib
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 import pandas as pd
 from llama_index.core.evaluation import FaithfulnessEvaluator, AnswerRelevancyEvaluator
 from llama_index.llms.openai import OpenAI
+from rapidfuzz import fuzz
+
+
+def _similarity_ratio(a: str, b: str) -> float:
+    """Case-insensitive Indel (LCS-based) similarity ratio between two strings in [0, 1]."""
+    return fuzz.ratio(a, b, processor=str.lower) / 100.0
 
 
 class TuningEvaluator:
@@ -16,9 +26,14 @@ class TuningEvaluator:
     Handles evaluation of agent responses during hyperparameter tuning.
     """
     
-    def __init__(self, openai_api_key: str, model: str = "gpt-4o"):
+    def __init__(self, openai_api_key: str, model: str = "gpt-4o", max_workers: int = 8, max_retries: int = 6):
         """Initialize evaluators."""
-        self.openai = OpenAI(model=model, api_key=openai_api_key)
+        self.max_workers = max_workers
+        
+        # (question, response, expected answer) hash -> (relevancy, faithfulness), shared across iterations
+        self._score_cache: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._score_cache_lock = threading.Lock()
+        self.openai = OpenAI(model=model, api_key=openai_api_key, max_retries=max_retries)
         self.faithfulness_evaluator = FaithfulnessEvaluator(llm=self.openai)
         self.relevancy_evaluator = AnswerRelevancyEvaluator(llm=self.openai)
     
@@ -57,62 +72,181 @@ class TuningEvaluator:
                 print(f"    ERROR: Expected AgentChatResponse but got {type(answer)}")
                 raise ValueError(f"Agent returned {type(answer)} instead of AgentChatResponse")
             
-            # Evaluate relevancy
-            relevancy_score = self._evaluate_relevancy(question, answer)
+            # Identical answers to the same question are only scored once per run
+            cache_key = self._score_cache_key(question, response_text, expected_answer)
+            cached_scores = self._get_cached_scores(cache_key)
             
-            # Evaluate faithfulness if expected answer provided
-            faithfulness_score = None
-            if expected_answer:
-                faithfulness_score = self._evaluate_faithfulness(
-                    question, answer, response_text, expected_answer
-                )
+            if cached_scores is not None:
+                relevancy_score, faithfulness_score = cached_scores
+                print("    Reusing cached scores for identical response")
+            else:
+                # Evaluate relevancy
+                relevancy_score, relevancy_ok = self._evaluate_relevancy(question, answer)
+                
+                # Evaluate faithfulness if expected answer provided
+                faithfulness_score, faithfulness_ok = None, True
+                if expected_answer:
+                    faithfulness_score, faithfulness_ok = self._evaluate_faithfulness(
+                        question, answer, response_text, expected_answer
+                    )
+                
+                # Scores from a failed evaluator call (rate limit, timeout) are not reused
+                if relevancy_ok and faithfulness_ok:
+                    self._store_cached_scores(cache_key, relevancy_score, faithfulness_score)
+            
+            return self._success_result(answer, response_text, response_time, relevancy_score, faithfulness_score)
+            
+        except Exception as e:
+            print(f"    Error evaluating question: {str(e)}")
+            return self._error_result(e)
+    
+    async def evaluate_single_response_async(
+        self, 
+        agent, 
+        question: str, 
+        expected_answer: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Async version of evaluate_single_response.
+        
+        Relevancy and faithfulness are evaluated concurrently once the answer is available.
+        """
+        start_time = time.time()
+        
+        try:
+            # Get agent's answer
+            answer = await agent.achat(question, get_response=True)
+            response_time = time.time() - start_time
+            
+            # Verify we have a proper response object
+            if not hasattr(answer, 'response'):
+                print(f"    ERROR: Expected AgentChatResponse but got {type(answer)}")
+                raise ValueError(f"Agent returned {type(answer)} instead of AgentChatResponse")
+            response_text = answer.response
             
-            return {
-                'success': True,
-                'answer': answer,
-                'response_text': response_text,
-                'response_time': response_time,
-                'relevancy_score': relevancy_score,
-                'faithfulness_score': faithfulness_score,
-                'error': None
-            }
+            cache_key = self._score_cache_key(question, response_text, expected_answer)
+            cached_scores = self._get_cached_scores(cache_key)
+            
+            if cached_scores is not None:
+                relevancy_score, faithfulness_score = cached_scores
+                print("    Reusing cached scores for identical response")
+            else:
+                faithfulness_score, faithfulness_ok = None, True
+                if expected_answer:
+                    (relevancy_score, relevancy_ok), (faithfulness_score, faithfulness_ok) = await asyncio.gather(
+                        self._aevaluate_relevancy(question, answer),
+                        self._aevaluate_faithfulness(question, answer, response_text, expected_answer)
+                    )
+                else:
+                    relevancy_score, relevancy_ok = await self._aevaluate_relevancy(question, answer)
+                
+                # Scores from a failed evaluator call (rate limit, timeout) are not reused
+                if relevancy_ok and faithfulness_ok:
+                    self._store_cached_scores(cache_key, relevancy_score, faithfulness_score)
+            
+            return self._success_result(answer, response_text, response_time, relevancy_score, faithfulness_score)
             
         except Exception as e:
             print(f"    Error evaluating question: {str(e)}")
-            return {
-                'success': False,
-                'answer': None,
-                'response_text': f"ERROR: {str(e)}",
-                'response_time': None,
-                'relevancy_score': 0.0,
-                'faithfulness_score': 0.0,
-                'error': str(e)
-            }
-    
-    def _evaluate_relevancy(self, question: str, answer) -> float:
-        """Evaluate relevancy of answer to question."""
+            return self._error_result(e)
+    
+    @staticmethod
+    def _success_result(answer, response_text: str, response_time: float,
+                        relevancy_score: float, faithfulness_score: Optional[float]) -> Dict[str, Any]:
+        """Build the result dictionary for a successfully evaluated question."""
+        return {
+            'success': True,
+            'answer': answer,
+            'response_text': response_text,
+            'response_time': response_time,
+            'relevancy_score': relevancy_score,
+            'faithfulness_score': faithfulness_score,
+            'error': None
+        }
+    
+    @staticmethod
+    def _error_result(error: Exception) -> Dict[str, Any]:
+        """Build the result dictionary for a question that failed to evaluate."""
+        return {
+            'success': False,
+            'answer': None,
+            'response_text': f"ERROR: {str(error)}",
+            'response_time': None,
+            'relevancy_score': 0.0,
+            'faithfulness_score': 0.0,
+            'error': str(error)
+        }
+    
+    def _get_cached_scores(self, cache_key: str) -> Optional[Tuple[float, Optional[float]]]:
+        """Return previously computed (relevancy, faithfulness) scores, if any."""
+        with self._score_cache_lock:
+            return self._score_cache.get(cache_key)
+    
+    def _store_cached_scores(self, cache_key: str, relevancy_score: float, faithfulness_score: Optional[float]) -> None:
+        """Remember the scores for a (question, response, expected answer) combination."""
+        with self._score_cache_lock:
+            self._score_cache[cache_key] = (relevancy_score, faithfulness_score)
+    
+    def get_score_cache(self) -> Dict[str, Tuple[float, Optional[float]]]:
+        """Return a copy of the memoized scores, e.g. to hand to another process."""
+        with self._score_cache_lock:
+            return dict(self._score_cache)
+    
+    def update_score_cache(self, entries: Dict[str, Tuple[float, Optional[float]]]) -> None:
+        """Merge memoized scores computed by another evaluator."""
+        with self._score_cache_lock:
+            self._score_cache.update(entries)
+    
+    @staticmethod
+    def _score_cache_key(question: str, response_text: str, expected_answer: Optional[str]) -> str:
+        """Hash the inputs that determine a response's evaluation scores."""
+        # An empty CSV cell arrives as NaN, which is truthy but not a string
+        expected_text = expected_answer if isinstance(expected_answer, str) else ''
+        payload = '\x00'.join((str(question), response_text, expected_text))
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _evaluate_relevancy(self, question: str, answer) -> Tuple[float, bool]:
+        """Evaluate relevancy of answer to question. Returns (score, whether the evaluator succeeded)."""
         try:
             print(f"    Evaluating relevancy with answer type: {type(answer)}")
             relevancy_result = self.relevancy_evaluator.evaluate_response(
                 query=question,
                 response=answer  # Pass the full AgentChatResponse object
             )
-            # Handle different return types from the evaluator
-            if hasattr(relevancy_result, 'score'):
-                relevancy_score = relevancy_result.score
-            elif hasattr(relevancy_result, 'passing'):
-                relevancy_score = 1.0 if relevancy_result.passing else 0.0
-            elif isinstance(relevancy_result, (int, float)):
-                relevancy_score = float(relevancy_result)
-            else:
-                relevancy_score = 0.5  # Default score if we can't determine
+            relevancy_score, succeeded = self._result_to_score(relevancy_result), True
         except Exception as eval_error:
             print(f"    Evaluation error: {eval_error}")
-            relevancy_score = 0.0
+            relevancy_score, succeeded = 0.0, False
         
         # Debug: Print the actual score we got
         print(f"    Relevancy score: {relevancy_score}")
-        return relevancy_score
+        return relevancy_score, succeeded
+    
+    async def _aevaluate_relevancy(self, question: str, answer) -> Tuple[float, bool]:
+        """Async version of _evaluate_relevancy."""
+        try:
+            relevancy_result = await self.relevancy_evaluator.aevaluate_response(
+                query=question,
+                response=answer
+            )
+            relevancy_score, succeeded = self._result_to_score(relevancy_result), True
+        except Exception as eval_error:
+            print(f"    Evaluation error: {eval_error}")
+            relevancy_score, succeeded = 0.0, False
+        
+        print(f"    Relevancy score: {relevancy_score}")
+        return relevancy_score, succeeded
+    
+    @staticmethod
+    def _result_to_score(result) -> float:
+        """Handle the different return types from LlamaIndex evaluators."""
+        if hasattr(result, 'score'):
+            return result.score
+        elif hasattr(result, 'passing'):
+            return 1.0 if result.passing else 0.0
+        elif isinstance(result, (int, float)):
+            return float(result)
+        return 0.5  # Default score if we can't determine
     
     def _evaluate_faithfulness(
         self, 
@@ -120,8 +254,8 @@ class TuningEvaluator:
         answer, 
         response_text: str, 
         expected_answer: str
-    ) -> float:
-        """Evaluate faithfulness of answer against expected answer."""
+    ) -> Tuple[float, bool]:
+        """Evaluate faithfulness of answer against expected answer. Returns (score, whether the evaluator succeeded)."""
         try:
             # For faithfulness evaluation, we need to use the evaluate method instead of evaluate_response
             # and pass the expected answer differently
@@ -130,58 +264,125 @@ class TuningEvaluator:
                 response=answer.response,  # Use the text response
                 contexts=[expected_answer]  # Expected answer as context
             )
-            # Handle different return types from the faithfulness evaluator
-            if hasattr(faithfulness_result, 'score'):
-                faithfulness_score = faithfulness_result.score
-            elif hasattr(faithfulness_result, 'passing'):
-                faithfulness_score = 1.0 if faithfulness_result.passing else 0.0
-            elif isinstance(faithfulness_result, (int, float)):
-                faithfulness_score = float(faithfulness_result)
-            else:
-                faithfulness_score = 0.5
+            return self._result_to_score(faithfulness_result), True
         except Exception as faith_error:
             print(f"    Faithfulness evaluation error: {faith_error}")
-            # Try alternative approach - use the expected answer as ground truth in a different way
-            try:
-                # Simple semantic similarity as fallback
-                similarity = difflib.SequenceMatcher(None, response_text.lower(), expected_answer.lower()).ratio()
-                faithfulness_score = similarity
-                print(f"    Using fallback similarity score: {faithfulness_score:.3f}")
-            except Exception as fallback_error:
-                print(f"    Fallback similarity calculation failed: {fallback_error}")
-                faithfulness_score = 0.0
-        
+            return self._fallback_faithfulness(response_text, expected_answer), False
+    
+    async def _aevaluate_faithfulness(
+        self, 
+        question: str, 
+        answer, 
+        response_text: str, 
+        expected_answer: str
+    ) -> Tuple[float, bool]:
+        """Async version of _evaluate_faithfulness."""
+        try:
+            faithfulness_result = await self.faithfulness_evaluator.aevaluate(
+                query=question,
+                response=answer.response,
+                contexts=[expected_answer]
+            )
+            return self._result_to_score(faithfulness_result), True
+        except Exception as faith_error:
+            print(f"    Faithfulness evaluation error: {faith_error}")
+            return self._fallback_faithfulness(response_text, expected_answer), False
+    
+    @staticmethod
+    def _fallback_faithfulness(response_text: str, expected_answer: str) -> float:
+        """Score faithfulness by string similarity when the LLM evaluator fails."""
+        # Try alternative approach - use the expected answer as ground truth in a different way
+        try:
+            # Simple semantic similarity as fallback
+            faithfulness_score = _similarity_ratio(response_text, expected_answer)
+            print(f"    Using fallback similarity score: {faithfulness_score:.3f}")
+        except Exception as fallback_error:
+            print(f"    Fallback similarity calculation failed: {fallback_error}")
+            faithfulness_score = 0.0
         return faithfulness_score
     
     def evaluate_dataset(
         self, 
         agent, 
         questions_df: pd.DataFrame
-    ) -> Tuple[List[Dict], List[float], List[float], List[float]]:
+    ) -> Tuple[List[Dict], np.ndarray, np.ndarray, np.ndarray]:
         """
         Evaluate agent on a dataset of questions.
         
+        Questions are evaluated concurrently (the work is almost entirely waiting on
+        OpenAI), each in its own agent session so chat memory is not shared.
+        
         Returns:
             Tuple of (evaluation_results, relevancy_scores, faithfulness_scores, response_times)
         """
+        print(f"Evaluating on {len(questions_df)} questions...")
+        
+        rows = list(questions_df.itertuples(index=True))
+        results = [None] * len(rows)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for position, row in enumerate(rows):
+                print(f"  Question {row.Index+1}/{len(questions_df)}: {row.question[:50]}...")
+                session = agent.spawn_session() if hasattr(agent, 'spawn_session') else agent
+                future = executor.submit(
+                    self.evaluate_single_response, session, row.question, getattr(row, 'expected_answer', None)
+                )
+                futures[future] = position
+            
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        
+        return self._collect_results(rows, results)
+    
+    async def evaluate_dataset_async(
+        self, 
+        agent, 
+        questions_df: pd.DataFrame
+    ) -> Tuple[List[Dict], np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Async version of evaluate_dataset.
+        
+        At most max_workers questions are in flight at once, each in its own agent session.
+        
+        Returns:
+            Tuple of (evaluation_results, relevancy_scores, faithfulness_scores, response_times)
+        """
+        print(f"Evaluating on {len(questions_df)} questions...")
+        
+        rows = list(questions_df.itertuples(index=True))
+        semaphore = asyncio.Semaphore(self.max_workers)
+        
+        async def _evaluate(row):
+            async with semaphore:
+                print(f"  Question {row.Index+1}/{len(questions_df)}: {row.question[:50]}...")
+                session = agent.spawn_session() if hasattr(agent, 'spawn_session') else agent
+                return await self.evaluate_single_response_async(
+                    session, row.question, getattr(row, 'expected_answer', None)
+                )
+        
+        results = await asyncio.gather(*(_evaluate(row) for row in rows))
+        return self._collect_results(rows, results)
+    
+    def _collect_results(
+        self, 
+        rows: List[Any], 
+        results: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict], np.ndarray, np.ndarray, np.ndarray]:
+        """Turn per-question results into detailed rows and score lists, in question order."""
         evaluation_results = []
         relevancy_scores = []
         faithfulness_scores = []
         response_times = []
         
-        print(f"Evaluating on {len(questions_df)} questions...")
-        
-        for idx, row in questions_df.iterrows():
-            question = row['question']
-            expected_category = row['expected_category']
-            keywords = row['keywords']
-            evaluation_notes = row['evaluation_notes']
-            expected_answer = row.get('expected_answer', None)  # Get expected answer if available
-            
-            print(f"  Question {idx+1}/{len(questions_df)}: {question[:50]}...")
-            
-            # Evaluate single response
-            result = self.evaluate_single_response(agent, question, expected_answer)
+        # Collect results in the original question order
+        for row, result in zip(rows, results):
+            idx = row.Index
+            question = row.question
+            expected_category = row.expected_category
+            keywords = row.keywords
+            evaluation_notes = row.evaluation_notes
+            expected_answer = getattr(row, 'expected_answer', None)  # Get expected answer if available
             
             # Extract results
             if result['success']:
@@ -220,4 +421,10 @@ class TuningEvaluator:
                     'response_time': None,
                 })
         
-        return evaluation_results, relevancy_scores, faithfulness_scores, response_times
+        # Missing values (failed responses have no response time) become NaN
+        return (
+            evaluation_results,
+            np.array(relevancy_scores, dtype=np.float64),
+            np.array(faithfulness_scores, dtype=np.float64),
+            np.array(response_times, dtype=np.float64)
+        )
@@ -4,7 +4,7 @@ Hyperparameter sampling and management for tuning runs.
 
 import json
 import numpy as np
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 
 class HyperparameterSampler:
@@ -12,8 +12,14 @@ class HyperparameterSampler:
     Handles hyperparameter space definition and sampling.
     """
     
-    def __init__(self, system_prompts_file: str = 'tuning/data/system_prompts/system_prompts.json'):
+    def __init__(
+        self, 
+        system_prompts_file: str = 'tuning/data/system_prompts/system_prompts.json',
+        seed: Optional[int] = None
+    ):
         """Initialize hyperparameter space."""
+        self.rng = np.random.default_rng(seed)
+        
         # Load system prompts from file
         with open(system_prompts_file, 'r') as f:
             self.system_prompts_dict = json.load(f)
@@ -22,6 +28,14 @@ class HyperparameterSampler:
         # Create mapping from prompt text to prompt name for identification
         self.prompt_text_to_name = {v: k for k, v in self.system_prompts_dict.items()}
         
+        # Sampled prompts are these same string objects, so they can be identified by id()
+        # without hashing the full text; the stored list keeps the ids from being reused
+        self.prompt_object_to_name = {id(v): k for k, v in self.system_prompts_dict.items()}
+        
+        # Parallel lists indexed by prompt ID, where ID 0 is the agent's default prompt
+        self.prompt_texts = [None] + self.system_prompts
+        self.prompt_names = ["default"] + list(self.system_prompts_dict.keys())
+        
         # Define hyperparameter space
         self.hyperparameters = { 
             'chunk_size': np.arange(256, 1025, 128).tolist(),
@@ -32,12 +46,15 @@ class HyperparameterSampler:
     
     def sample_hyperparameters(self) -> Dict[str, Any]:
         """Sample a random set of hyperparameters."""
-        return { 
-            'chunk_size': int(np.random.choice(self.hyperparameters['chunk_size'])),
-            'chunk_overlap': int(np.random.choice(self.hyperparameters['chunk_overlap'])),
-            'similarity_top_k': int(np.random.choice(self.hyperparameters['similarity_top_k'])),
-            'system_prompt_override': np.random.choice(self.hyperparameters['system_prompt_override'])
-        }
+        # Draw one index per hyperparameter; indexing the Python lists keeps the
+        # prompt strings (and None) as-is instead of coercing them to a NumPy array.
+        # The system prompt index doubles as its prompt ID.
+        names = list(self.hyperparameters)
+        sizes = [len(self.hyperparameters[name]) for name in names]
+        indices = self.rng.integers(0, sizes)
+        sampled = {name: self.hyperparameters[name][int(i)] for name, i in zip(names, indices)}
+        sampled['system_prompt_id'] = int(indices[names.index('system_prompt_override')])
+        return sampled
     
     def get_hyperparameter_space(self) -> Dict[str, List]:
         """Get the full hyperparameter space."""
@@ -47,14 +64,21 @@ class HyperparameterSampler:
         """Get list of available system prompts."""
         return self.system_prompts.copy()
     
+    def resolve_prompt(self, prompt_id: int) -> Tuple[Optional[str], str]:
+        """Get the (text, name) of a sampled system prompt ID."""
+        return self.prompt_texts[prompt_id], self.prompt_names[prompt_id]
+    
     def get_prompt_name(self, prompt_text: str) -> str:
         """Get the name/identifier for a system prompt."""
         if prompt_text is None:
             return "default"
         
-        # Look up the name for this prompt text
+        # Prompts handed out by sample_hyperparameters match by identity; others by text
+        name = self.prompt_object_to_name.get(id(prompt_text))
+        if name is not None:
+            return name
         return self.prompt_text_to_name.get(prompt_text, "unknown_custom")
     
     def get_prompt_names(self) -> List[str]:
         """Get list of available system prompt names."""
-        return ["default"] + list(self.system_prompts_dict.keys())
+        return self.prompt_names.copy()
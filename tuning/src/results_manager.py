@@ -3,6 +3,7 @@ Results management for hyperparameter tuning runs.
 Handles saving detailed results and iteration summaries.
 """
 
+import csv
 import os
 import pandas as pd
 import numpy as np
@@ -15,11 +16,28 @@ class ResultsManager:
     Manages saving and organizing tuning results.
     """
     
-    def __init__(self, results_dir: str = 'tuning/results'):
-        """Initialize results manager."""
+    def __init__(self, results_dir: str = 'tuning/results', flush_interval: int = 8):
+        """
+        Initialize results manager.
+        
+        Args:
+            results_dir: Directory for result CSVs
+            flush_interval: Number of iterations to buffer before writing to disk
+        """
         self.results_dir = results_dir
         self.prompt_sampler = None
+        self.flush_interval = flush_interval
         os.makedirs(self.results_dir, exist_ok=True)
+        
+        # Rows waiting to be appended to the result CSVs
+        self._detail_buffer: List[Dict] = []
+        self._summary_buffer: List[Dict] = []
+        
+        # Checked once here so flushes don't stat the files again
+        self._detail_file = os.path.join(self.results_dir, 'detailed_results.csv')
+        self._summary_file = os.path.join(self.results_dir, 'iteration_summary.csv')
+        self._detailed_header_written = os.path.exists(self._detail_file)
+        self._summary_header_written = os.path.exists(self._summary_file)
     
     def set_prompt_sampler(self, sampler):
         """Set the hyperparameter sampler for prompt identification."""
@@ -30,78 +48,106 @@ class ResultsManager:
         iteration: int,
         sampled_params: Dict[str, Any],
         evaluation_results: List[Dict],
-        relevancy_scores: List[float],
-        faithfulness_scores: List[float],
-        response_times: List[float],
+        relevancy_scores: np.ndarray,
+        faithfulness_scores: np.ndarray,
+        response_times: np.ndarray,
         questions_df: pd.DataFrame
     ) -> None:
         """Save results for a single iteration."""
         timestamp = datetime.now().isoformat()
         
-        # Get the specific system prompt name
-        if self.prompt_sampler:
-            system_prompt_name = self.prompt_sampler.get_prompt_name(sampled_params['system_prompt_override'])
-        else:
-            system_prompt_name = 'custom' if sampled_params['system_prompt_override'] else 'default'
+        system_prompt_name = self._get_system_prompt_name(sampled_params)
+        
+        # Iteration info is the same for every evaluation result
+        system_prompt = sampled_params['system_prompt_override']
+        iteration_info = {
+            'iteration': iteration,
+            'timestamp': timestamp,
+            'chunk_size': sampled_params['chunk_size'],
+            'chunk_overlap': sampled_params['chunk_overlap'],
+            'similarity_top_k': sampled_params['similarity_top_k'],
+            'system_prompt_name': system_prompt_name,
+            'system_prompt': system_prompt[:50] + "..." if system_prompt else None
+        }
         
         # Add iteration info to each evaluation result
         for result in evaluation_results:
-            result.update({
-                'iteration': iteration,
-                'timestamp': timestamp,
-                'chunk_size': sampled_params['chunk_size'],
-                'chunk_overlap': sampled_params['chunk_overlap'],
-                'similarity_top_k': sampled_params['similarity_top_k'],
-                'system_prompt_name': system_prompt_name,
-                'system_prompt': sampled_params['system_prompt_override'][:50] + "..." if sampled_params['system_prompt_override'] else None
-            })
+            result.update(iteration_info)
         
         # Save detailed results
         self._save_detailed_results(evaluation_results)
         
         # Save iteration summary
         self._save_iteration_summary(
-            iteration, timestamp, sampled_params, 
+            iteration, timestamp, sampled_params, system_prompt_name,
             relevancy_scores, faithfulness_scores, response_times, questions_df
         )
+        
+        if len(self._summary_buffer) >= self.flush_interval:
+            self.flush()
+    
+    def _get_system_prompt_name(self, sampled_params: Dict[str, Any]) -> str:
+        """Get the specific system prompt name for a sampled configuration."""
+        if self.prompt_sampler:
+            # Sampled prompt IDs resolve by index; fall back to a text lookup for hand-built params
+            if sampled_params.get('system_prompt_id') is not None:
+                return self.prompt_sampler.resolve_prompt(sampled_params['system_prompt_id'])[1]
+            return self.prompt_sampler.get_prompt_name(sampled_params['system_prompt_override'])
+        return 'custom' if sampled_params['system_prompt_override'] else 'default'
     
     def _save_detailed_results(self, evaluation_results: List[Dict]) -> None:
-        """Save detailed results to CSV."""
-        results_file = os.path.join(self.results_dir, 'detailed_results.csv')
-        results_df = pd.DataFrame(evaluation_results)
+        """Queue detailed results for the next flush."""
+        self._detail_buffer.extend(evaluation_results)
+    
+    def flush(self) -> None:
+        """Write all buffered rows to the result CSVs."""
+        if self._detail_buffer:
+            self._detailed_header_written = self._append_rows(
+                self._detail_file, self._detail_buffer, self._detailed_header_written
+            )
+            self._detail_buffer = []
         
-        if os.path.exists(results_file):
-            # Append to existing file
-            results_df.to_csv(results_file, mode='a', header=False, index=False)
-        else:
-            # Create new file with headers
-            results_df.to_csv(results_file, index=False)
+        if self._summary_buffer:
+            self._summary_header_written = self._append_rows(
+                self._summary_file, self._summary_buffer, self._summary_header_written
+            )
+            self._summary_buffer = []
+    
+    @staticmethod
+    def _append_rows(path: str, rows: List[Dict], header_written: bool) -> bool:
+        """Append rows to a CSV with the stdlib writer, adding the header to a new file."""
+        with open(path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            if not header_written:
+                writer.writeheader()
+            writer.writerows(rows)
+        return True
+    
+    def close(self) -> None:
+        """Flush any remaining buffered results."""
+        self.flush()
     
     def _save_iteration_summary(
         self,
         iteration: int,
         timestamp: str,
         sampled_params: Dict[str, Any],
-        relevancy_scores: List[float],
-        faithfulness_scores: List[float],
-        response_times: List[float],
+        system_prompt_name: str,
+        relevancy_scores: np.ndarray,
+        faithfulness_scores: np.ndarray,
+        response_times: np.ndarray,
         questions_df: pd.DataFrame
     ) -> None:
         """Save iteration summary to CSV."""
-        # Compute statistics
-        valid_relevancy_scores = [s for s in relevancy_scores if s is not None]
-        valid_faithfulness_scores = [s for s in faithfulness_scores if s is not None]
-        valid_response_times = [t for t in response_times if t is not None]
-        
-        avg_relevancy = np.mean(valid_relevancy_scores) if valid_relevancy_scores else 0.0
-        avg_faithfulness = np.mean(valid_faithfulness_scores) if valid_faithfulness_scores else 0.0
-        avg_response_time = np.mean(valid_response_times) if valid_response_times else 0.0
+        # Compute statistics (missing values are NaN)
+        relevancy_scores, faithfulness_scores, response_times = (
+            np.asarray(values, dtype=np.float64) for values in (relevancy_scores, faithfulness_scores, response_times)
+        )
+        valid_relevancy = np.isfinite(relevancy_scores)
         
-        # Get the specific system prompt name
-        if self.prompt_sampler:
-            system_prompt_name = self.prompt_sampler.get_prompt_name(sampled_params['system_prompt_override'])
-        else:
-            system_prompt_name = 'custom' if sampled_params['system_prompt_override'] else 'default'
+        avg_relevancy = self._average(relevancy_scores)
+        avg_faithfulness = self._average(faithfulness_scores)
+        avg_response_time = self._average(response_times)
         
         # Create summary data
         summary_data = {
@@ -115,80 +161,87 @@ class ResultsManager:
             'avg_relevancy': avg_relevancy,
             'avg_faithfulness': avg_faithfulness,
             'avg_response_time': avg_response_time,
-            'valid_responses': len(valid_relevancy_scores),
+            'valid_responses': int(valid_relevancy.sum()),
             'total_questions': len(questions_df),
-            'individual_relevancy_scores': str(valid_relevancy_scores),  # Convert to string for CSV
-            'individual_faithfulness_scores': str(valid_faithfulness_scores),
-            'individual_response_times': str(valid_response_times)
+            'individual_relevancy_scores': str(relevancy_scores[valid_relevancy].tolist()),  # Convert to string for CSV
+            'individual_faithfulness_scores': str(faithfulness_scores[np.isfinite(faithfulness_scores)].tolist()),
+            'individual_response_times': str(response_times[np.isfinite(response_times)].tolist())
         }
         
-        # Save to CSV
-        summary_file = os.path.join(self.results_dir, 'iteration_summary.csv')
-        summary_df = pd.DataFrame([summary_data])
-        
-        if os.path.exists(summary_file):
-            summary_df.to_csv(summary_file, mode='a', header=False, index=False)
-        else:
-            summary_df.to_csv(summary_file, index=False)
+        self._summary_buffer.append(summary_data)
     
     def print_iteration_results(
         self,
         iteration: int,
         total_iterations: int,
         sampled_params: Dict[str, Any],
-        relevancy_scores: List[float],
-        faithfulness_scores: List[float],
-        response_times: List[float],
+        relevancy_scores: np.ndarray,
+        faithfulness_scores: np.ndarray,
+        response_times: np.ndarray,
         questions_df: pd.DataFrame
     ) -> None:
         """Print iteration results to console."""
-        # Compute statistics
-        valid_relevancy_scores = [s for s in relevancy_scores if s is not None]
-        valid_faithfulness_scores = [s for s in faithfulness_scores if s is not None]
-        valid_response_times = [t for t in response_times if t is not None]
+        # Compute statistics (missing values are NaN)
+        relevancy_scores, faithfulness_scores, response_times = (
+            np.asarray(values, dtype=np.float64) for values in (relevancy_scores, faithfulness_scores, response_times)
+        )
+        valid_relevancy = np.isfinite(relevancy_scores)
         
         # Log individual scores for debugging
-        print(f"  Individual relevancy scores: {valid_relevancy_scores}")
-        print(f"  Individual faithfulness scores: {valid_faithfulness_scores}")
+        print(f"  Individual relevancy scores: {relevancy_scores[valid_relevancy].tolist()}")
+        print(f"  Individual faithfulness scores: {faithfulness_scores[np.isfinite(faithfulness_scores)].tolist()}")
         
-        avg_relevancy = np.mean(valid_relevancy_scores) if valid_relevancy_scores else 0.0
-        avg_faithfulness = np.mean(valid_faithfulness_scores) if valid_faithfulness_scores else 0.0
-        avg_response_time = np.mean(valid_response_times) if valid_response_times else 0.0
+        avg_relevancy = self._average(relevancy_scores)
+        avg_faithfulness = self._average(faithfulness_scores)
+        avg_response_time = self._average(response_times)
+        
+        if valid_relevancy.any():
+            relevancy_range = f"{np.nanmin(relevancy_scores)}-{np.nanmax(relevancy_scores)}"
+        else:
+            relevancy_range = "N/A-N/A"
         
         print(f"Iteration {iteration} results:")
-        print(f"  Average Relevancy: {avg_relevancy:.3f} (range: {min(valid_relevancy_scores) if valid_relevancy_scores else 'N/A'}-{max(valid_relevancy_scores) if valid_relevancy_scores else 'N/A'})")
+        print(f"  Average Relevancy: {avg_relevancy:.3f} (range: {relevancy_range})")
         print(f"  Average Faithfulness: {avg_faithfulness:.3f}")
         print(f"  Average Response Time: {avg_response_time:.2f}s")
-        print(f"  Valid Responses: {len(valid_relevancy_scores)}/{len(questions_df)}")
+        print(f"  Valid Responses: {int(valid_relevancy.sum())}/{len(questions_df)}")
         print(f"Completed iteration {iteration}/{total_iterations}")
         print("-" * 50)
     
+    @staticmethod
+    def _average(values: np.ndarray) -> float:
+        """Mean of the non-NaN values, or 0.0 if there are none."""
+        return float(np.nanmean(values)) if np.isfinite(values).any() else 0.0
+    
     def get_best_configuration(self) -> Dict[str, Any]:
         """Get the best performing configuration from results."""
-        summary_file = os.path.join(self.results_dir, 'iteration_summary.csv')
-        
-        if not os.path.exists(summary_file):
+        # Include iterations that are still buffered
+        self.flush()
+        if not self._summary_header_written:
             return {}
         
         try:
-            df = pd.read_csv(summary_file)
-            if len(df) == 0:
-                return {}
+            # Single pass over the summary keeping only the best row so far
+            best_config, best_score = None, None
+            with open(self._summary_file, newline='') as f:
+                for row in csv.DictReader(f):
+                    # Find best configuration based on combined relevancy and faithfulness
+                    combined_score = (float(row['avg_relevancy']) + float(row['avg_faithfulness'])) / 2
+                    if best_score is None or combined_score > best_score:
+                        best_config, best_score = row, combined_score
             
-            # Find best configuration based on combined relevancy and faithfulness
-            df['combined_score'] = (df['avg_relevancy'] + df['avg_faithfulness']) / 2
-            best_idx = df['combined_score'].idxmax()
-            best_config = df.iloc[best_idx]
+            if best_config is None:
+                return {}
             
             return {
-                'iteration': best_config['iteration'],
-                'chunk_size': best_config['chunk_size'],
-                'chunk_overlap': best_config['chunk_overlap'],
-                'similarity_top_k': best_config['similarity_top_k'],
+                'iteration': int(best_config['iteration']),
+                'chunk_size': int(best_config['chunk_size']),
+                'chunk_overlap': int(best_config['chunk_overlap']),
+                'similarity_top_k': int(best_config['similarity_top_k']),
                 'system_prompt_type': best_config['system_prompt_type'],
-                'avg_relevancy': best_config['avg_relevancy'],
-                'avg_faithfulness': best_config['avg_faithfulness'],
-                'combined_score': best_config['combined_score']
+                'avg_relevancy': float(best_config['avg_relevancy']),
+                'avg_faithfulness': float(best_config['avg_faithfulness']),
+                'combined_score': best_score
             }
         except Exception as e:
             print(f"Error finding best configuration: {e}")
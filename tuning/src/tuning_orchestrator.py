@@ -5,6 +5,10 @@ Coordinates the entire tuning process.
 
 import sys
 import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
 # Add repository root to path to import from src
@@ -18,6 +22,92 @@ from tuning.src.hyperparameter_sampler import HyperparameterSampler
 from tuning.src.results_manager import ResultsManager
 
 
+def _evaluate_chunking_group(
+    evaluator: TuningEvaluator,
+    sampler: HyperparameterSampler,
+    group: List[Tuple[int, Dict[str, Any]]],
+    questions_df: pd.DataFrame,
+    total_iterations: int
+) -> Iterator[Tuple]:
+    """
+    Evaluate iterations that share a (chunk_size, chunk_overlap), ingesting documents once.
+    
+    Yields:
+        (iteration, sampled_params, evaluation_results, relevancy_scores, faithfulness_scores, response_times)
+        for every iteration that completed
+    """
+    agent = None
+    for iteration, sampled_params in group:
+        try:
+            print(f"Starting tuning iteration {iteration}/{total_iterations}")
+            
+            system_prompt, system_prompt_name = sampler.resolve_prompt(sampled_params['system_prompt_id'])
+            printable_params = {k: v for k, v in sampled_params.items() if k != 'system_prompt_override'}
+            print(f"Sampled hyperparameters: {printable_params} (system prompt: {system_prompt_name})")
+            
+            if agent is not None:
+                # Same chunks as the previous iteration: only retrieval and prompt change
+                print(f"Reusing ingested index for chunk_size={sampled_params['chunk_size']}, "
+                      f"chunk_overlap={sampled_params['chunk_overlap']}")
+                agent.update_query_settings(
+                    similarity_top_k=sampled_params['similarity_top_k'],
+                    system_prompt_override=system_prompt
+                )
+            else:
+                # Initialize agent with sampled hyperparameters
+                new_agent = Agent(
+                    name="TuningAgent",
+                    use_pinecone=False,  # Use local indexing for tuning, not Pinecone
+                    chunk_size=sampled_params['chunk_size'],
+                    chunk_overlap=sampled_params['chunk_overlap'],
+                    similarity_top_k=sampled_params['similarity_top_k'],
+                    system_prompt_override=system_prompt
+                )
+                
+                # Local indexes are built per chunking configuration
+                new_agent.ingest_directory('data/raw/')  # Use the same directory as your original
+                agent = new_agent
+            
+            # Evaluate agent
+            evaluation_results, relevancy_scores, faithfulness_scores, response_times = \
+                evaluator.evaluate_dataset(agent, questions_df)
+            
+            yield iteration, sampled_params, evaluation_results, relevancy_scores, faithfulness_scores, response_times
+            
+        except Exception as e:
+            print(f"Error in iteration {iteration}: {str(e)}")
+            continue
+
+
+def _evaluate_chunking_group_in_worker(
+    sampler: HyperparameterSampler,
+    group: List[Tuple[int, Dict[str, Any]]],
+    questions_df: pd.DataFrame,
+    total_iterations: int,
+    score_cache: Dict[str, Tuple[float, Optional[float]]]
+) -> Tuple[List[Tuple], Dict[str, Tuple[float, Optional[float]]]]:
+    """
+    Process pool entry point: configure this process, then evaluate one chunking group.
+    
+    The evaluator is seeded with the parent's memoized scores, and the scores it adds are
+    returned so the parent can pass them on to later groups. Iterations completed before
+    an unexpected error are still returned.
+    """
+    config = Configuration()
+    evaluator = TuningEvaluator(config.get('openai_api_key'), max_retries=config.get('openai_max_retries', 6))
+    evaluator.update_score_cache(score_cache)
+    
+    group_results = []
+    try:
+        for iteration_result in _evaluate_chunking_group(evaluator, sampler, group, questions_df, total_iterations):
+            group_results.append(iteration_result)
+    except Exception as e:
+        print(f"Error in tuning worker: {str(e)}")
+    
+    new_scores = {key: scores for key, scores in evaluator.get_score_cache().items() if key not in score_cache}
+    return group_results, new_scores
+
+
 class HyperparameterTuner:
     """
     Main class for orchestrating hyperparameter tuning runs.
@@ -30,7 +120,7 @@ class HyperparameterTuner:
         openai_api_key = self.config.get('openai_api_key')
         
         # Initialize components
-        self.evaluator = TuningEvaluator(openai_api_key)
+        self.evaluator = TuningEvaluator(openai_api_key, max_retries=self.config.get('openai_max_retries', 6))
         self.sampler = HyperparameterSampler()
         self.results_manager = ResultsManager()
         
@@ -41,62 +131,105 @@ class HyperparameterTuner:
         self.questions_df = pd.read_csv(questions_file)
         print(f"Loaded {len(self.questions_df)} evaluation questions")
     
-    def run_tuning(self, iterations: int = 10) -> None:
+    def run_tuning(self, iterations: int = 10, processes: Optional[int] = None) -> None:
         """
         Run hyperparameter tuning for specified number of iterations.
         
         Args:
             iterations: Number of tuning iterations to run
+            processes: Worker processes evaluating chunking configurations in parallel
+                (defaults to 1, which runs everything in this process). Each worker starts
+                from the scores memoized so far, so groups running at the same time cannot
+                reuse each other's scores.
         """
         print(f"Starting hyperparameter tuning with {iterations} iterations...")
         print("=" * 60)
         
-        for i in range(iterations):
-            try:
-                print(f"Starting tuning iteration {i+1}/{iterations}")
-                
-                # Sample hyperparameters
-                sampled_params = self.sampler.sample_hyperparameters()
-                print(f"Sampled hyperparameters: {sampled_params}")
-                
-                # Initialize agent with sampled hyperparameters
-                agent = Agent(
-                    name="TuningAgent",
-                    use_pinecone=False,  # Use local indexing for tuning, not Pinecone
-                    chunk_size=sampled_params['chunk_size'],
-                    chunk_overlap=sampled_params['chunk_overlap'],
-                    similarity_top_k=sampled_params['similarity_top_k'],
-                    system_prompt_override=sampled_params['system_prompt_override']
-                )
-                
-                # Ingest documents (assumes documents are in 'data/documents/')
-                # For local indexing, we need to ingest documents each time
-                agent.ingest_directory('data/raw/')  # Use the same directory as your original
-                
-                # Evaluate agent
-                evaluation_results, relevancy_scores, faithfulness_scores, response_times = \
-                    self.evaluator.evaluate_dataset(agent, self.questions_df)
-                
-                # Save and print results
-                self.results_manager.save_iteration_results(
-                    i+1, sampled_params, evaluation_results,
-                    relevancy_scores, faithfulness_scores, response_times,
-                    self.questions_df
-                )
-                
-                self.results_manager.print_iteration_results(
-                    i+1, iterations, sampled_params,
-                    relevancy_scores, faithfulness_scores, response_times,
-                    self.questions_df
-                )
-                
-            except Exception as e:
-                print(f"Error in iteration {i+1}: {str(e)}")
-                continue
+        try:
+            self._run_iterations(iterations, processes)
+        finally:
+            # Never lose buffered results, even if the run is interrupted
+            self.results_manager.close()
         
         # Print final summary
         self._print_final_summary()
     
+    def _run_iterations(self, iterations: int, processes: Optional[int] = None) -> None:
+        """Run the sample, ingest, evaluate and save loop."""
+        # Sample every configuration up front and run those with the same chunking back
+        # to back, so their documents are ingested (and embedded) only once
+        param_sets = [self.sampler.sample_hyperparameters() for _ in range(iterations)]
+        param_sets.sort(key=self._chunking_key)
+        groups = [
+            list(group) for _, group in
+            groupby(enumerate(param_sets, start=1), key=lambda item: self._chunking_key(item[1]))
+        ]
+        
+        processes = min(processes or 1, len(groups))
+        if processes <= 1:
+            for group in groups:
+                for iteration_result in _evaluate_chunking_group(self.evaluator, self.sampler, group, self.questions_df, iterations):
+                    self._record_iteration(iterations, *iteration_result)
+            return
+        
+        # Chunking groups are independent; results are written here so the CSVs have a single writer.
+        # Groups are submitted as workers free up so each one starts from the latest score cache.
+        print(f"Evaluating {len(groups)} chunking configurations in {processes} processes")
+        pending_groups = iter(groups)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            def submit_next():
+                group = next(pending_groups, None)
+                if group is None:
+                    return None
+                return executor.submit(
+                    _evaluate_chunking_group_in_worker, self.sampler, group, self.questions_df, iterations,
+                    self.evaluator.get_score_cache()
+                )
+            
+            running = {future for future in (submit_next() for _ in range(processes)) if future is not None}
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        group_results, new_scores = future.result()
+                    except Exception as e:
+                        print(f"Error in tuning worker: {str(e)}")
+                    else:
+                        self.evaluator.update_score_cache(new_scores)
+                        for iteration_result in group_results:
+                            self._record_iteration(iterations, *iteration_result)
+                    next_future = submit_next()
+                    if next_future is not None:
+                        running.add(next_future)
+    
+    def _record_iteration(
+        self,
+        total_iterations: int,
+        iteration: int,
+        sampled_params: Dict[str, Any],
+        evaluation_results: List[Dict],
+        relevancy_scores: np.ndarray,
+        faithfulness_scores: np.ndarray,
+        response_times: np.ndarray
+    ) -> None:
+        """Save and print the results of one completed iteration."""
+        self.results_manager.save_iteration_results(
+            iteration, sampled_params, evaluation_results,
+            relevancy_scores, faithfulness_scores, response_times,
+            self.questions_df
+        )
+        
+        self.results_manager.print_iteration_results(
+            iteration, total_iterations, sampled_params,
+            relevancy_scores, faithfulness_scores, response_times,
+            self.questions_df
+        )
+    
+    @staticmethod
+    def _chunking_key(sampled_params: Dict[str, Any]) -> Tuple[int, int]:
+        """Iterations with the same chunking can share one ingested index."""
+        return sampled_params['chunk_size'], sampled_params['chunk_overlap']
+    
     def _print_final_summary(self) -> None:
         """Print final summary of tuning results."""
         print("Hyperparameter tuning complete! Results saved in tuning/results/")